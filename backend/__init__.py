@@ -1,5 +1,21 @@
+import os
+import sys
+
 from flask import Flask
-from .main import app  
+
+# The backend's modules import each other by top-level name, as they do when main.py
+# runs from this directory. Put the directory on sys.path so those names resolve when
+# the backend is imported as a package too, and register main as backend.main so both
+# names refer to one module (and one set of indexes). Snapshots pickle classes under
+# the same top-level names either way.
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if _BACKEND_DIR not in sys.path:
+    sys.path.insert(0, _BACKEND_DIR)
+
+import main  # noqa: E402
+
+sys.modules[__name__ + ".main"] = main
+app = main.app
 
 # Create and configure the Flask app
 def create_app():
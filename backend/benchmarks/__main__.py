@@ -0,0 +1,74 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+import numpy as np
+
+from benchmarks import e2e, micro
+from benchmarks.generate import SCALES, ensure_dataset
+from benchmarks.timing import timed
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark ingestion, the index structures and the HTTP endpoints on synthetic data"
+    )
+    parser.add_argument("--scale", choices=sorted(SCALES), action="append",
+                        help="dataset size; repeat for several (default: 10k)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ops", type=int, default=100_000, help="operations per micro-benchmark")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--workers", type=int, help="ingestion worker processes (default: automatic)")
+    parser.add_argument("--skip-e2e", action="store_true")
+    parser.add_argument("--json", help="results file (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    results = {"environment": environment(), "seed": args.seed, "scales": {}}
+    for scale in args.scale or ["10k"]:
+        generate_seconds, data_file = timed(lambda: ensure_dataset(scale, args.seed))
+        print(f"[{scale}] dataset {data_file} ready in {generate_seconds:.1f}s")
+        scale_results = {"rows": SCALES[scale], "micro": micro.run(data_file, args.ops, args.seed, args.workers)}
+        if not args.skip_e2e:
+            scale_results["e2e"] = e2e.run(data_file, args.requests, args.seed)
+        results["scales"][scale] = scale_results
+        print(json.dumps(scale_results, indent=2))
+
+    path = args.json
+    if path is None:
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"bench-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
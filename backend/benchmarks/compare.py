@@ -0,0 +1,37 @@
+import argparse
+import json
+import sys
+
+
+def flatten(results, prefix=""):
+    # {"a": {"b": 1.0}} -> {"a.b": 1.0}, numbers only
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = flatten(json.load(f)["scales"])
+    with open(args.candidate) as f:
+        candidate = flatten(json.load(f)["scales"])
+
+    # For *_per_sec metrics higher is better; for seconds and latencies lower is
+    for key in sorted(baseline.keys() & candidate.keys()):
+        old, new = baseline[key], candidate[key]
+        ratio = new / old if old else float("inf")
+        print(f"{key:70} {old:>14,.3f} {new:>14,.3f} {ratio:>8.2f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
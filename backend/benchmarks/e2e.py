@@ -0,0 +1,78 @@
+import os
+import random
+import tempfile
+from urllib.parse import quote
+
+from benchmarks.timing import latency_summary, timed
+import main
+
+
+def start_registry(data_file, snapshot_file):
+    # Point the app at a fresh registry for data_file and wait for its indexes
+    registry = main.IndexRegistry(data_file, snapshot_file)
+    registry.add_listener(main.search_cache.clear)
+    registry.add_listener(main.ranking_cache.clear)
+    main.registry = registry
+    registry.start()
+    indexes = registry.get()
+    if indexes is None:
+        raise RuntimeError(f"index build failed: {registry.error}")
+    return indexes
+
+
+def _search_bodies(store, count, rng):
+    # Pantry-style queries: a few ingredients from one recipe plus a few from others
+    bodies = []
+    for _ in range(count):
+        ingredients = store.ingredients(rng.randrange(len(store)))
+        ingredients = rng.sample(ingredients, min(len(ingredients), 3))
+        ingredients += store.ingredients(rng.randrange(len(store)))[:2]
+        bodies.append({"ingredients": ingredients})
+    return bodies
+
+
+def measure(send, requests, cold):
+    # Per-request latencies; cold runs empty the result caches before every request
+    latencies, statuses = [], {}
+    for request in requests:
+        if cold:
+            main.search_cache.clear()
+            main.ranking_cache.clear()
+        seconds, response = timed(lambda: send(request))
+        latencies.append(seconds)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    summary = latency_summary(latencies)
+    summary["statuses"] = {str(code): count for code, count in sorted(statuses.items())}
+    return summary
+
+
+def run(data_file, requests=500, seed=0):
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Cold start from the CSV, then a restart from the snapshot it wrote
+        snapshot_file = os.path.join(tmp, "RAW_recipes.snapshot")
+        startup = {"csv_build_seconds": start_registry(data_file, snapshot_file).build_seconds}
+        indexes = start_registry(data_file, snapshot_file)
+        startup["snapshot_build_seconds"] = indexes.build_seconds
+
+        client = main.app.test_client()
+        store = indexes.store
+        bodies = _search_bodies(store, requests, rng)
+        # The same pantries limited to quick recipes, fastest first
+        filtered = [dict(body, max_minutes=rng.choice((15, 30, 60)), sort_by="total_time") for body in bodies]
+        names = [quote(store.name(rng.randrange(len(store))), safe="") for _ in range(requests)]
+
+        results = {"startup": startup}
+        for data_structure in ("hashmap", "trie"):
+            def send(body):
+                return client.post("/search", json=dict(body, data_structure=data_structure))
+            cold = measure(send, bodies, cold=True)
+            # Warm: the same requests again once every one of them has been answered
+            measure(send, bodies, cold=False)
+            results[f"search_{data_structure}"] = {"cold": cold, "warm": measure(send, bodies, cold=False)}
+            results[f"search_{data_structure}_filtered"] = {"cold": measure(send, filtered, cold=True)}
+        for data_structure in ("trie", "hashmap"):
+            results[f"recipe_{data_structure}"] = measure(
+                lambda name: client.get(f"/recipe/{data_structure}/{name}"), names, cold=False
+            )
+        return results
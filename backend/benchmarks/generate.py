@@ -0,0 +1,153 @@
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+
+from store import PREDEFINED_TAGS
+
+# Same header as Food.com's RAW_recipes.csv, including the columns ingestion skips
+HEADER = [
+    "name", "id", "minutes", "contributor_id", "submitted", "tags", "nutrition",
+    "n_steps", "steps", "description", "ingredients", "n_ingredients",
+]
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+_ADJECTIVES = [
+    "easy", "quick", "classic", "spicy", "creamy", "grandma's", "healthy", "crispy",
+    "slow cooker", "one pot", "sweet", "smoky", "lemon", "garlic", "cheesy", "rustic",
+]
+_DISHES = [
+    "chicken", "beef", "pork", "tofu", "salmon", "shrimp", "lentil", "potato", "mushroom",
+    "pasta", "rice", "bean", "pumpkin", "apple", "chocolate", "banana", "corn", "spinach",
+]
+_COURSES = [
+    "soup", "stew", "casserole", "salad", "pie", "bread", "muffins", "curry", "tacos",
+    "stir fry", "bake", "cookies", "chili", "pancakes", "skillet", "bowl",
+]
+_STAPLES = [
+    "salt", "butter", "sugar", "onion", "water", "eggs", "garlic cloves", "milk", "flour",
+    "olive oil", "pepper", "all-purpose flour", "garlic", "brown sugar", "baking soda",
+]
+_FOODS = [
+    "chicken", "beef", "pork", "tofu", "salmon", "shrimp", "lentils", "potatoes", "mushrooms",
+    "pasta", "rice", "beans", "pumpkin", "apples", "chocolate", "bananas", "corn", "spinach",
+    "tomatoes", "carrots", "celery", "cheddar", "parmesan", "cream", "yogurt", "honey",
+    "cinnamon", "cumin", "paprika", "oregano", "basil", "parsley", "ginger", "lime", "lemon",
+]
+_FORMS = ["", "fresh ", "dried ", "chopped ", "ground ", "frozen ", "canned ", "low-fat ", "shredded "]
+_OTHER_TAGS = [
+    "60-minutes-or-less", "time-to-make", "course", "main-ingredient", "preparation",
+    "occasion", "easy", "main-dish", "4-hours-or-less", "15-minutes-or-less", "cuisine",
+]
+_VERBS = ["preheat", "combine", "stir", "whisk", "bake", "simmer", "chop", "serve", "fold", "season"]
+
+
+def _ingredient_pool():
+    # Staples lead the list so the Zipf-like weights below make them the most common
+    pool = list(_STAPLES)
+    pool.extend(f"{form}{food}" for form in _FORMS for food in _FOODS)
+    return pool
+
+
+def _zipf_cum_weights(count, exponent=1.1):
+    total, cum = 0.0, []
+    for rank in range(1, count + 1):
+        total += 1.0 / rank ** exponent
+        cum.append(total)
+    return cum
+
+
+def generate_rows(rows, seed=0):
+    # Yield RAW_recipes.csv rows (as lists in HEADER order); the same seed always
+    # produces the same data
+    rng = random.Random(seed)
+    ingredients = _ingredient_pool()
+    ingredient_weights = _zipf_cum_weights(len(ingredients))
+    tags = sorted(PREDEFINED_TAGS) + _OTHER_TAGS
+    tag_weights = _zipf_cum_weights(len(tags), exponent=0.6)
+
+    for recipe_id in range(rows):
+        name = f"{rng.choice(_ADJECTIVES)} {rng.choice(_DISHES)} {rng.choice(_COURSES)}"
+        if rng.random() < 0.3:
+            # Vary names so only some of them repeat, as in the real data
+            name = f"{name} {rng.randrange(rows)}"
+
+        recipe_ingredients = list(dict.fromkeys(
+            rng.choices(ingredients, cum_weights=ingredient_weights, k=rng.randint(2, 18))
+        ))
+        recipe_tags = list(dict.fromkeys(rng.choices(tags, cum_weights=tag_weights, k=rng.randint(3, 20))))
+        steps = [
+            f"{rng.choice(_VERBS)} the {rng.choice(recipe_ingredients)}"
+            + (" until it's done" if rng.random() < 0.1 else "")
+            for _ in range(rng.randint(1, 15))
+        ]
+
+        roll = rng.random()
+        if roll < 0.02:
+            description = ""
+        elif roll < 0.025:
+            description = "#NAME?"
+        else:
+            description = f"my family's favorite {name}. makes {rng.randint(2, 12)} servings"
+
+        yield [
+            name,
+            recipe_id,
+            0 if rng.random() < 0.01 else rng.choice([5, 10, 15, 20, 30, 45, 60, 90, 120, 240]),
+            rng.randrange(1, 50_000),
+            f"{rng.randint(1999, 2018)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            str(recipe_tags),
+            str([round(rng.uniform(0, 800), 1) for _ in range(7)]),
+            len(steps),
+            str(steps),
+            description,
+            str(recipe_ingredients),
+            len(recipe_ingredients),
+        ]
+
+
+def write_csv(path, rows, seed=0):
+    # Write to a temporary name first so an interrupted run never leaves a truncated file
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(generate_rows(rows, seed))
+    os.replace(tmp_path, path)
+    return path
+
+
+def dataset_path(scale, seed=0, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"RAW_recipes_{scale}_seed{seed}.csv")
+
+
+def ensure_dataset(scale, seed=0, data_dir=DATA_DIR):
+    # Generated files are deterministic, so an existing one is reused
+    path = dataset_path(scale, seed, data_dir)
+    if not os.path.exists(path):
+        write_csv(path, SCALES[scale], seed)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic RAW_recipes.csv")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="10k")
+    parser.add_argument("--rows", type=int, help="exact row count (overrides --scale)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="output path (default: benchmarks/data/)")
+    args = parser.parse_args(argv)
+
+    rows = args.rows if args.rows is not None else SCALES[args.scale]
+    label = args.scale if args.rows is None else str(rows)
+    path = args.out or dataset_path(label, args.seed)
+    started = time.perf_counter()
+    write_csv(path, rows, args.seed)
+    print(f"Wrote {rows:,} rows to {path} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
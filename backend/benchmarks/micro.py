@@ -0,0 +1,118 @@
+import os
+import random
+import tempfile
+
+from benchmarks.timing import per_second, timed
+from details import DetailStore
+from hashmap import HashMap
+from ingest import ingest_csv
+from inverted_index import InvertedIndex
+from main import load_hashmap, load_name_map, load_nameTrie, load_trie
+from numeric_index import NUMERIC_FIELDS, NumericIndex
+from scoring import ScoringMatrix
+from store import RecipeStore
+from trie import NameTrie, Trie
+
+
+def bench_ingestion(data_file, workers=None):
+    # Every step between the CSV and servable indexes, in the order the server runs them.
+    # Returns (results, store) so the structure benchmarks can reuse the parsed data.
+    results = {}
+    seconds, parsed = timed(lambda: ingest_csv(data_file, workers=workers))
+    results["ingest_csv"] = {"seconds": seconds, "rows_per_sec": parsed.rows_per_second}
+    seconds, (store, cold) = timed(lambda: RecipeStore.from_ingest(parsed))
+    results["RecipeStore.from_ingest"] = {"seconds": seconds, "rows_per_sec": per_second(len(store), seconds)}
+    with tempfile.TemporaryDirectory() as tmp:
+        seconds, details = timed(lambda: DetailStore.create(os.path.join(tmp, "RAW_recipes.details"), store, cold))
+    results["DetailStore.create"] = {"seconds": seconds, "file_bytes": details.file_bytes}
+
+    seconds, index = timed(lambda: InvertedIndex.from_store(store))
+    results["InvertedIndex.from_store"] = {"seconds": seconds}
+    seconds, _ = timed(lambda: ScoringMatrix.from_index(index, len(store)))
+    results["ScoringMatrix.from_index"] = {"seconds": seconds}
+    seconds, _ = timed(lambda: [NumericIndex.from_values(getattr(store, field)) for field in NUMERIC_FIELDS])
+    results["NumericIndex.from_values"] = {"seconds": seconds}
+    for label, build in (
+        ("load_trie", lambda: load_trie(store, Trie())),
+        ("load_nameTrie", lambda: load_nameTrie(store, NameTrie())),
+        ("load_hashmap", lambda: load_hashmap(store)),
+        ("load_name_map", lambda: load_name_map(store)),
+    ):
+        seconds, _ = timed(build)
+        results[label] = {"seconds": seconds}
+    results["rows"] = len(store)
+    results["store_bytes"] = store.nbytes
+    return results, store
+
+
+def _ingredient_pairs(store, count, rng):
+    # (ingredient, recipe_id) pairs from random recipes, as the loaders insert them
+    pairs = []
+    while len(pairs) < count:
+        recipe_id = rng.randrange(len(store))
+        pairs.extend((ingredient, recipe_id) for ingredient in store.ingredients(recipe_id))
+    return pairs[:count]
+
+
+def bench_trie(store, count, rng):
+    pairs = _ingredient_pairs(store, count, rng)
+    trie = Trie()
+    insert_seconds, _ = timed(lambda: [trie.insert(ingredient, recipe_id) for ingredient, recipe_id in pairs])
+    trie.finalize()
+    keys = [ingredient for ingredient, _ in rng.sample(pairs, min(count, len(pairs)))]
+    search_seconds, _ = timed(lambda: [trie.search(key) for key in keys])
+    prefixes = [key[:rng.randint(1, 3)] for key in keys]
+    prefix_seconds, _ = timed(lambda: [trie.prefix_search(prefix) for prefix in prefixes])
+    return {
+        "insert_ops_per_sec": per_second(len(pairs), insert_seconds),
+        "search_ops_per_sec": per_second(len(keys), search_seconds),
+        "prefix_search_ops_per_sec": per_second(len(prefixes), prefix_seconds),
+    }
+
+
+def bench_name_trie(store, count, rng):
+    recipe_ids = [rng.randrange(len(store)) for _ in range(count)]
+    names = [store.name(recipe_id) for recipe_id in recipe_ids]
+    trie = NameTrie()
+    insert_seconds, _ = timed(lambda: [trie.insert(name, recipe_id) for name, recipe_id in zip(names, recipe_ids)])
+    trie.finalize()
+    search_seconds, _ = timed(lambda: [trie.search(name) for name in names])
+    prefixes = [name[:rng.randint(1, 6)] for name in names]
+    prefix_seconds, _ = timed(lambda: [trie.prefix_search(prefix) for prefix in prefixes])
+    return {
+        "insert_ops_per_sec": per_second(count, insert_seconds),
+        "search_ops_per_sec": per_second(count, search_seconds),
+        "prefix_search_ops_per_sec": per_second(count, prefix_seconds),
+    }
+
+
+def bench_hashmap(store, count, rng):
+    recipe_ids = [rng.randrange(len(store)) for _ in range(count)]
+    results = {}
+    for label, keys in (
+        ("recipe_ids", recipe_ids),
+        ("names", [store.name(recipe_id).lower() for recipe_id in recipe_ids]),
+    ):
+        table = HashMap()
+        insert_seconds, _ = timed(lambda: [table.insert(key, i) for i, key in enumerate(keys)])
+        get_seconds, _ = timed(lambda: [table.get(key) for key in keys])
+        bulk = HashMap()
+        items = [(key, i) for i, key in enumerate(keys)]
+        bulk_seconds, _ = timed(lambda: bulk.bulk_insert(items))
+        results[label] = {
+            "insert_ops_per_sec": per_second(count, insert_seconds),
+            "bulk_insert_ops_per_sec": per_second(count, bulk_seconds),
+            "get_ops_per_sec": per_second(count, get_seconds),
+        }
+    return results
+
+
+def run(data_file, count=100_000, seed=0, workers=None):
+    ingestion, store = bench_ingestion(data_file, workers)
+    rng = random.Random(seed)
+    return {
+        "ingestion": ingestion,
+        "Trie": bench_trie(store, count, rng),
+        "NameTrie": bench_name_trie(store, count, rng),
+        "HashMap": bench_hashmap(store, count, rng),
+    }
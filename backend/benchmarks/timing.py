@@ -0,0 +1,30 @@
+import statistics
+import time
+
+
+def timed(func):
+    # (seconds, result) of one call
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def per_second(count, seconds):
+    return count / seconds if seconds > 0 else float("inf")
+
+
+def latency_summary(samples):
+    # Per-request latencies in seconds -> milliseconds percentiles
+    ordered = sorted(samples)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        "requests": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
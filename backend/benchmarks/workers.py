@@ -0,0 +1,218 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.generate import SCALES, ensure_dataset
+from benchmarks.timing import per_second, timed
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEMORY_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def memory_breakdown(pid):
+    # Resident memory of one process in bytes, split into pages shared with other
+    # processes and private ones (Linux /proc/<pid>/smaps_rollup); None elsewhere
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    memory = {}
+    for line in lines:
+        field, _, value = line.partition(":")
+        if field in MEMORY_FIELDS:
+            memory[field.lower()] = int(value.split()[0]) * 1024
+    memory["private"] = memory.get("private_clean", 0) + memory.get("private_dirty", 0)
+    return memory
+
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The parent pid is the second field after the parenthesised command name
+        if stat.rsplit(")", 1)[1].split()[1] == str(pid):
+            children.append(int(entry))
+    return sorted(children)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _request(connection, method, path, body=None):
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    connection.request(method, path, body=body, headers=headers)
+    response = connection.getresponse()
+    return response.status, response.read()
+
+
+def wait_ready(port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            status, body = _request(connection, "GET", "/ready")
+            connection.close()
+            if status == 200:
+                return json.loads(body)
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} was not ready after {timeout}s")
+
+
+def _search_bodies(port, count, rng):
+    # Distinct queries built from real recipes' ingredients, fetched through the API
+    # itself. The server caches responses and rankings, so a repeated query would be
+    # measured as a cache hit rather than a search.
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    pool = set()
+    for first in "abcdefghijklmnopqrstuvwxyz":
+        for second in "aeioulnrst":
+            _, body = _request(connection, "GET", f"/autocomplete/ingredients?q={first}{second}")
+            pool.update(completion["ingredient"] for completion in json.loads(body)["completions"])
+    connection.close()
+    if len(pool) < 5:
+        raise RuntimeError("autocomplete returned too few ingredients to build distinct queries")
+    pool = sorted(pool)
+    seen, bodies = set(), []
+    while len(bodies) < count:
+        ingredients = tuple(sorted(rng.sample(pool, rng.randint(2, 5))))
+        if ingredients not in seen:
+            seen.add(ingredients)
+            bodies.append(json.dumps({"ingredients": list(ingredients)}))
+    return bodies
+
+
+def drive(port, bodies, concurrency):
+    # Send every body to /search from `concurrency` keep-alive connections; requests/second
+    chunks = [bodies[i::concurrency] for i in range(concurrency)]
+    errors = []
+
+    def client(chunk):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        for body in chunk:
+            status, _ = _request(connection, "POST", "/search", body)
+            if status != 200:
+                errors.append(status)
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(chunk,)) for chunk in chunks]
+
+    def run_all():
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    seconds, _ = timed(run_all)
+    return {"requests": len(bodies), "seconds": seconds, "per_second": per_second(len(bodies), seconds),
+            "errors": len(errors)}
+
+
+def measure(data_file, workers, requests, concurrency, seed=0, timeout=600, result_caches=True):
+    # Start `main.py serve` on data_file, load it, and report the master's memory
+    # (which holds the indexes) against each worker's private memory. Without result
+    # caches, a worker's private memory is only what searching un-shares.
+    rng = random.Random(seed)
+    port = _free_port()
+    command = [sys.executable, os.path.join(BACKEND_DIR, "main.py"), "serve",
+               "--workers", str(workers), "--port", str(port)]
+    if not result_caches:
+        command.append("--no-result-cache")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.symlink(os.path.abspath(data_file), os.path.join(tmp, "RAW_recipes.csv"))
+        with open(os.path.join(tmp, "serve.log"), "w") as log:
+            server = subprocess.Popen(
+                command,
+                cwd=tmp, stdout=log, stderr=subprocess.STDOUT,
+            )
+            try:
+                ready = wait_ready(port, timeout)
+                bodies = _search_bodies(port, requests, rng)
+                idle = {pid: memory_breakdown(pid) for pid in child_pids(server.pid)}
+                throughput = drive(port, bodies, concurrency)
+                pids = child_pids(server.pid)
+                loaded = [memory_breakdown(pid) for pid in pids]
+                master = memory_breakdown(server.pid)
+            finally:
+                server.terminate()
+                server.wait(timeout=60)
+
+    if master is None or any(memory is None for memory in loaded):
+        return {"workers": workers, "throughput": throughput, "memory": None}
+    private = [memory["private"] for memory in loaded]
+    return {
+        "workers": len(pids),
+        "recipes": ready["recipes"],
+        "source": ready["source"],
+        "throughput": throughput,
+        "memory": {
+            "master_rss": master["rss"],
+            # What every worker would hold if each built its own indexes
+            "unshared_total_estimate": master["rss"] * (len(pids) + 1),
+            "total_pss": master["pss"] + sum(memory["pss"] for memory in loaded),
+            "worker_private_idle": [idle[pid]["private"] for pid in pids if idle.get(pid)],
+            "worker_private_loaded": private,
+            "worker_shared_loaded": [memory["shared_clean"] + memory["shared_dirty"] for memory in loaded],
+            "mean_worker_overhead_ratio": sum(private) / len(private) / master["rss"],
+        },
+    }
+
+
+def _mb(value):
+    return f"{value / 2**20:8.1f} MB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure per-worker memory overhead and throughput of `main.py serve`"
+    )
+    parser.add_argument("--scale", choices=sorted(SCALES), default="100k")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, action="append",
+                        help="worker count; repeat for several (default: 1 and the CPU count)")
+    parser.add_argument("--requests", type=int, default=2000, help="/search requests per run")
+    parser.add_argument("--concurrency", type=int, help="client connections (default: 2 per worker)")
+    parser.add_argument("--no-result-cache", dest="result_caches", action="store_false",
+                        help="serve without response and ranking caches, so every request searches")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    data_file = ensure_dataset(args.scale, args.seed)
+    results = {"scale": args.scale, "runs": []}
+    for workers in args.workers or sorted({1, os.cpu_count() or 1}):
+        run = measure(data_file, workers, args.requests, args.concurrency or 2 * workers, args.seed,
+                      result_caches=args.result_caches)
+        results["runs"].append(run)
+        line = f"{workers:3} workers  {run['throughput']['per_second']:>8,.0f} req/s"
+        memory = run["memory"]
+        if memory is not None:
+            mean_private = sum(memory["worker_private_loaded"]) / len(memory["worker_private_loaded"])
+            line += (f"  master RSS {_mb(memory['master_rss'])}  worker private {_mb(mean_private)}"
+                     f" ({memory['mean_worker_overhead_ratio']:.1%})  total PSS {_mb(memory['total_pss'])}")
+        print(line)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
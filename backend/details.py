@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder produces the same JSON
+    orjson = None
+
+# Recipes don't change between rebuilds of the CSV, so browsers and CDNs may reuse a
+# detail response for this long before revalidating it with its ETag
+DETAIL_MAX_AGE_SECONDS = 3600
+# Detail files start with a random token naming their content; snapshots record it
+TOKEN_SIZE = 16
+ETAG_SIZE = 8
+# Bodies are serialized and written this many recipes at a time, which bounds the
+# memory a build needs for them
+SERIALIZE_CHUNK = 10000
+
+
+def dumps(payload):
+    # Compact UTF-8 JSON with sorted keys, the same document jsonify produces
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(body):
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def recipe_detail(store, recipe_id, description, steps):
+    return {
+        "id": recipe_id,
+        "name": store.name(recipe_id),
+        "description": description or "Description not available",
+        "minutes": int(store.minutes[recipe_id]),
+        "tags": store.tags(recipe_id),
+        "n_steps": int(store.n_steps[recipe_id]),
+        "steps": steps,
+        "ingredients": store.ingredients(recipe_id),
+        "n_ingredients": int(store.n_ingredients[recipe_id])
+    }
+
+
+def _write_bodies(file, store, cold, start):
+    # Append the detail bodies of the recipes from row start on, given their cold
+    # (description, steps), to file. Returns (file offsets of the bodies plus the end of
+    # the last, concatenated ETag digests).
+    lengths, etags = [], []
+    position = None
+    for chunk_start in range(0, len(cold), SERIALIZE_CHUNK):
+        bodies = [
+            dumps(recipe_detail(store, recipe_id, description, steps))
+            for recipe_id, (description, steps) in enumerate(
+                cold[chunk_start:chunk_start + SERIALIZE_CHUNK], start + chunk_start
+            )
+        ]
+        written_at = file.append(b"".join(bodies))
+        if position is None:
+            position = written_at
+        lengths.extend(len(body) for body in bodies)
+        etags.extend(hashlib.blake2b(body, digest_size=ETAG_SIZE).digest() for body in bodies)
+    if position is None:
+        position = file.append(b"")  # nothing to write; just the end of the file
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets + position, b"".join(etags)
+
+
+def _write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+# Append-only file of detail bodies, shared by every generation built over it. Bytes
+# already written never change, so a generation reading its own offsets is unaffected
+# by rows appended for the next one. Reads use pread and need no lock.
+class DetailFile:
+    def __init__(self, fd, token, path=None):
+        self.fd = fd
+        self.token = token
+        self.path = path  # None for an unnamed temporary file
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, path, fill):
+        # A new file at path with a fresh token; fill(file) appends its initial content
+        # and its result is returned with the file. The file is written under a temporary
+        # name and renamed once filled, so a reader never sees a partial one.
+        token = os.urandom(TOKEN_SIZE)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        try:
+            file = cls(os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC | os.O_APPEND, 0o644), token, path)
+        except OSError as e:
+            # Serve from an unnamed file instead, which disappears once closed; the
+            # next start rebuilds it
+            print(f"Error: could not write detail file {path}: {e}; using a temporary file")
+            with tempfile.TemporaryFile() as f:
+                file = cls(os.dup(f.fileno()), token)
+            tmp_path = None
+        try:
+            file.append(token)
+            result = fill(file)
+            if tmp_path is not None:
+                os.replace(tmp_path, path)
+        except BaseException:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return file, result
+
+    @classmethod
+    def open(cls, path, token, size):
+        # The file at path if it holds the content token names and at least size bytes
+        fd = os.open(path, os.O_RDWR | os.O_APPEND)
+        if os.pread(fd, TOKEN_SIZE, 0) != token or os.fstat(fd).st_size < size:
+            os.close(fd)
+            raise ValueError(f"{path} does not match the snapshot")
+        return cls(fd, token, path)
+
+    def read(self, start, end):
+        return os.pread(self.fd, end - start, start)
+
+    def append(self, data):
+        # Returns the file offset data was written at
+        with self._lock:
+            start = os.lseek(self.fd, 0, os.SEEK_END)
+            _write_all(self.fd, data)
+            return start
+
+    def __del__(self):
+        os.close(self.fd)
+
+
+# Cold tier of the recipe store: every recipe's /recipe response body, serialized
+# once when its rows are ingested and kept on disk in a DetailFile. Only the byte
+# offsets and a strong ETag per recipe stay in memory; bodies are read on demand,
+# and the most popular ones are kept in an LRU cache shared across generations.
+class DetailStore:
+    def __init__(self, file, offsets, etags, cache=None):
+        self.file = file
+        self.offsets = offsets  # file offsets of each body, plus the end of the last
+        self.etags = etags      # ETAG_SIZE-byte digests of each body, concatenated
+        self.cache = cache
+
+    @classmethod
+    def create(cls, path, store, cold, cache=None):
+        file, (offsets, etags) = DetailFile.create(path, lambda file: _write_bodies(file, store, cold, 0))
+        return cls(file, offsets, etags, cache)
+
+    def extended(self, store, cold):
+        # A new instance that also covers the rows store appended after this one's;
+        # their bodies are appended to the same file
+        if not cold:
+            return self
+        offsets, etags = _write_bodies(self.file, store, cold, len(self))
+        offsets = np.concatenate([self.offsets, offsets[1:]])
+        return DetailStore(self.file, offsets, bytes(self.etags) + etags, self.cache)
+
+    def to_sections(self):
+        return {
+            "details.token": self.file.token,
+            "details.offsets": self.offsets.tobytes(),
+            "details.etags": bytes(self.etags),
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot, path, cache=None):
+        # Offsets and ETags are views into the snapshot; raises OSError or ValueError
+        # when the detail file at path is missing or is not the one the snapshot indexed
+        offsets = snapshot.array("details.offsets", np.int64)
+        file = DetailFile.open(path, bytes(snapshot.section("details.token")), int(offsets[-1]))
+        return cls(file, offsets, snapshot.section("details.etags"), cache)
+
+    def body(self, recipe_id):
+        # Bodies never change under a token, so the cache is keyed by it and needs no
+        # clearing when a new generation appends rows
+        key = (self.file.token, recipe_id)
+        if self.cache is not None:
+            body = self.cache.get(key)
+            if body is not None:
+                return body
+        body = self.file.read(int(self.offsets[recipe_id]), int(self.offsets[recipe_id + 1]))
+        if self.cache is not None:
+            self.cache.put(key, body, len(body))
+        return body
+
+    def detail(self, recipe_id):
+        return loads(self.body(recipe_id))
+
+    def etag(self, recipe_id):
+        return self.etags[recipe_id * ETAG_SIZE:(recipe_id + 1) * ETAG_SIZE].hex()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        # Memory held for the index; the bodies themselves are on disk
+        return self.offsets.nbytes + len(self.etags)
+
+    @property
+    def file_bytes(self):
+        return int(self.offsets[-1])
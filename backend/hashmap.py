@@ -0,0 +1,113 @@
+# Marks a slot whose key was deleted; lookups probe past it, inserts may reuse it
+_DELETED = object()
+_MIN_CAPACITY = 8
+
+
+def _capacity_for(count):
+    capacity = _MIN_CAPACITY
+    while capacity < count:
+        capacity *= 2
+    return capacity
+
+
+# HashMap Data Structure: open addressing with linear probing over two parallel
+# slot arrays (keys and values). Capacity is a power of two so a slot index is a mask.
+class HashMap:
+    MAX_LOAD = 0.7
+
+    def __init__(self, size=1000):
+        self.size = _capacity_for(size)
+        self._keys = [None] * self.size
+        self._values = [None] * self.size
+        self.count = 0  # live entries
+        self._used = 0  # live entries plus tombstones; drives resizing
+
+    def hash_function(self, key):
+        # Integer keys (recipe IDs) hash to themselves, so consecutive IDs fill
+        # consecutive slots without collisions; anything else uses the builtin hash
+        hash_value = key if type(key) is int else hash(key)
+        return hash_value & (self.size - 1)
+
+    def _probe(self, key):
+        # Returns (slot, found). When the key is absent the slot is where it should
+        # be inserted: the first tombstone passed, or the empty slot that ended the probe.
+        keys = self._keys
+        mask = self.size - 1
+        index = self.hash_function(key)
+        free = -1
+        while True:
+            slot_key = keys[index]
+            if slot_key is None:
+                return (index if free < 0 else free), False
+            if slot_key is _DELETED:
+                if free < 0:
+                    free = index
+            elif slot_key is key or slot_key == key:
+                return index, True
+            index = (index + 1) & mask
+
+    def insert(self, key, value):
+        index, found = self._probe(key)
+        if found:
+            self._values[index] = value  # Update value if key exists
+            return
+        if self._keys[index] is None:
+            self._used += 1
+        self._keys[index] = key
+        self._values[index] = value
+        self.count += 1
+        if self._used > self.size * self.MAX_LOAD:
+            self.resize()
+
+    def get(self, key):
+        index, found = self._probe(key)
+        return self._values[index] if found else None  # None when the key is not found
+
+    def delete(self, key):
+        index, found = self._probe(key)
+        if not found:
+            return False  # Key not found
+        self._keys[index] = _DELETED
+        self._values[index] = None
+        self.count -= 1
+        return True
+
+    def get_all_items(self):
+        return [
+            (key, value) for key, value in zip(self._keys, self._values)
+            if key is not None and key is not _DELETED
+        ]
+
+    def resize(self, capacity=None):
+        # Rehash every live entry into a table of the given capacity (default: double).
+        # Tombstones are dropped along the way.
+        items = self.get_all_items()
+        self.size = _capacity_for(capacity if capacity is not None else self.size * 2)
+        self._keys = [None] * self.size
+        self._values = [None] * self.size
+        self.count = self._used = 0
+        for key, value in items:
+            self.insert(key, value)
+
+    def bulk_insert(self, items):
+        # Size the table for the whole batch up front so loading never resizes midway
+        if not hasattr(items, "__len__"):
+            items = list(items)
+        needed = self._used + len(items)
+        if needed > self.size * self.MAX_LOAD:
+            self.resize(int(needed / self.MAX_LOAD) + 1)
+        for key, value in items:
+            self.insert(key, value)
+
+    def copy(self):
+        # Slot arrays are copied, keys and values shared
+        clone = HashMap(0)
+        clone.size = self.size
+        clone._keys = list(self._keys)
+        clone._values = list(self._values)
+        clone.count = self.count
+        clone._used = self._used
+        return clone
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,167 @@
+from concurrent.futures import ProcessPoolExecutor
+import ast
+import csv
+import io
+import json
+import multiprocessing
+import os
+import time
+
+import pandas as pd
+
+CSV_COLUMNS = [
+    "name", "minutes", "submitted", "tags", "n_steps", "steps",
+    "description", "ingredients", "n_ingredients",
+]
+LIST_COLUMNS = ["tags", "steps", "ingredients"]
+CHUNK_SIZE = 20000
+# Below this size spawning the process pool costs more than it saves
+POOL_MIN_BYTES = 32 * 1024 * 1024
+
+
+def _literal_list(value):
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def parse_list_column(values):
+    # The list columns hold Python reprs such as "['salt', 'eggs']". A repr with no
+    # double quote and no backslash has no element containing a quote, so swapping
+    # quotes gives valid JSON and the whole batch is decoded with one json.loads call.
+    # Everything else goes through ast.literal_eval one value at a time.
+    result = [[] for _ in values]
+    fast_rows, fast_source = [], []
+    for i, value in enumerate(values):
+        if not isinstance(value, str):
+            continue
+        if '"' in value or "\\" in value:
+            result[i] = _literal_list(value)
+        else:
+            fast_rows.append(i)
+            fast_source.append(value.replace("'", '"'))
+
+    if fast_rows:
+        try:
+            parsed = json.loads("[" + ",".join(fast_source) + "]")
+        except json.JSONDecodeError:
+            parsed = None
+        # A malformed value can still decode but shift the batch; fall back if so
+        if parsed is None or len(parsed) != len(fast_rows):
+            parsed = [_literal_list(values[i]) for i in fast_rows]
+        for i, value in zip(fast_rows, parsed):
+            result[i] = value if isinstance(value, list) else []
+    return result
+
+
+def parse_chunk(columns):
+    # columns maps a CSV column to its raw values for one chunk (missing cells are None)
+    for column in LIST_COLUMNS:
+        columns[column] = parse_list_column(columns[column])
+    return columns
+
+
+def _chunk_columns(chunk):
+    columns = {}
+    for column in CSV_COLUMNS:
+        if column in chunk:
+            series = chunk[column]
+            columns[column] = series.astype(object).where(series.notna(), None).tolist()
+        else:
+            columns[column] = [None] * len(chunk)
+    return columns
+
+
+# Parsed CSV columns shared by every index builder, plus throughput figures
+class IngestResult:
+    def __init__(self, columns, seconds):
+        self.columns = columns
+        self.rows = len(columns["name"])
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+    def rows_iter(self):
+        # Yield (row_index, {column: value}) pairs in file order
+        names = list(self.columns)
+        for index, values in enumerate(zip(*(self.columns[name] for name in names))):
+            yield index, dict(zip(names, values))
+
+
+# Read-only file object over bytes [start, end) of a file, so pandas can parse part of
+# a CSV that is still being appended to without ever reading past a known row boundary
+class ByteRange(io.RawIOBase):
+    def __init__(self, path, start, end):
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._remaining <= 0:
+            return 0
+        view = memoryview(buffer)[:min(len(buffer), self._remaining)]
+        count = self._file.readinto(view)
+        self._remaining -= count
+        return count
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def read_header(data_file):
+    with open(data_file, newline="", encoding="utf-8") as f:
+        return next(csv.reader(f))
+
+
+def default_workers():
+    return max(1, min(4, (os.cpu_count() or 1) - 1))
+
+
+def ingest_csv(data_file, chunk_size=CHUNK_SIZE, workers=None, start=0, end=None):
+    # Read the CSV in chunks and parse the list columns in batches, spreading the
+    # chunks over a process pool when more than one worker is requested. With a byte
+    # range only those rows are read: start is 0 or the offset of a row after the
+    # header, end the offset just past a row's newline.
+    started = time.perf_counter()
+    if end is None:
+        end = os.path.getsize(data_file)
+    if workers is None:
+        workers = default_workers() if end - start >= POOL_MIN_BYTES else 1
+    header = {} if start == 0 else {"header": None, "names": read_header(data_file)}
+    columns = {column: [] for column in CSV_COLUMNS}
+    with io.BufferedReader(ByteRange(data_file, start, end), buffer_size=1 << 20) as source:
+        reader = pd.read_csv(
+            source,
+            usecols=lambda column: column in CSV_COLUMNS,
+            chunksize=chunk_size,
+            low_memory=False,
+            **header,
+        )
+        chunks = (_chunk_columns(chunk) for chunk in reader)
+
+        if workers > 1:
+            # Spawned workers only import this module, so forking the (threaded) server is avoided
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                parsed_chunks = pool.map(parse_chunk, chunks)
+                for parsed in parsed_chunks:
+                    for column in CSV_COLUMNS:
+                        columns[column].extend(parsed[column])
+        else:
+            for chunk in chunks:
+                parsed = parse_chunk(chunk)
+                for column in CSV_COLUMNS:
+                    columns[column].extend(parsed[column])
+
+    result = IngestResult(columns, time.perf_counter() - started)
+    print(f"Ingested {result.rows} rows from {data_file} in {result.seconds:.2f}s "
+          f"({result.rows_per_second:,.0f} rows/s, {workers} worker(s))")
+    return result
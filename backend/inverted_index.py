@@ -0,0 +1,77 @@
+from itertools import repeat
+import heapq
+
+import numpy as np
+
+
+def merge_postings(lists):
+    # k-way merge of sorted posting lists given as (recipe_id, ingredient) pairs; yields
+    # (recipe_id, matched ingredients) in recipe ID order, touching only recipes that
+    # appear in some list
+    current, matched = None, []
+    for recipe_id, ingredient in heapq.merge(*lists):
+        if recipe_id != current:
+            if matched:
+                yield current, matched
+            current, matched = recipe_id, []
+        matched.append(ingredient)
+    if matched:
+        yield current, matched
+
+
+# Inverted index from a canonical ingredient term to the sorted IDs of the recipes that
+# use it. Posting lists are slices of one int32 array, addressed by per-term offsets.
+class InvertedIndex:
+    def __init__(self, lexicon, offsets, recipe_ids, term_counts):
+        self.lexicon = lexicon
+        self.terms = lexicon.terms
+        self.offsets = offsets
+        self.recipe_ids = recipe_ids
+        # Number of distinct terms in each recipe
+        self.term_counts = term_counts
+
+    @classmethod
+    def from_store(cls, store):
+        offsets, recipe_ids = store.term_postings()
+        term_counts = np.bincount(recipe_ids, minlength=len(store)).astype(np.int32)
+        return cls(store.lexicon, offsets, recipe_ids, term_counts)
+
+    def extended(self, store, start):
+        # Index of store, given that this one covers its rows before start. The new rows'
+        # IDs are larger than any indexed so far, so each merged posting list is the old
+        # list followed by the new rows' list; no re-sorting is needed.
+        terms = store.lexicon.terms
+        delta_offsets, delta_ids = store.term_postings(start)
+
+        # Terms first seen in the new rows have empty old posting lists
+        old_offsets = np.concatenate([self.offsets, np.full(len(terms) - len(self.terms), self.offsets[-1])])
+        old_counts, new_counts = np.diff(old_offsets), np.diff(delta_offsets)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(old_counts + new_counts, out=offsets[1:])
+
+        # Move both sets of postings to their slots in the merged array
+        recipe_ids = np.empty(int(offsets[-1]), dtype=np.int32)
+        old_shift = np.repeat(offsets[:-1] - old_offsets[:-1], old_counts)
+        recipe_ids[np.arange(len(self.recipe_ids)) + old_shift] = self.recipe_ids
+        new_shift = np.repeat(offsets[:-1] + old_counts - delta_offsets[:-1], new_counts)
+        recipe_ids[np.arange(len(delta_ids)) + new_shift] = delta_ids
+
+        term_counts = np.concatenate([
+            self.term_counts,
+            np.bincount(delta_ids - start, minlength=len(store) - start).astype(np.int32),
+        ])
+        return InvertedIndex(store.lexicon, offsets, recipe_ids, term_counts)
+
+    def postings(self, term_id):
+        return self.recipe_ids[self.offsets[term_id]:self.offsets[term_id + 1]]
+
+    def match(self, query_terms, postings=None):
+        # Yields (recipe_id, matched ingredients) for a query given as ingredient -> term ID,
+        # in recipe ID order. postings(term_id) may supply the lists instead, e.g. memoized
+        # across a batch.
+        if postings is None:
+            postings = lambda term_id: self.postings(term_id).tolist()
+        return merge_postings([zip(postings(term_id), repeat(ing)) for ing, term_id in query_terms.items()])
+
+    def __len__(self):
+        return len(self.terms)
@@ -0,0 +1,120 @@
+import re
+
+import numpy as np
+
+# Plurals the suffix rules below get wrong
+IRREGULAR_PLURALS = {
+    "leaves": "leaf",
+    "halves": "half",
+    "loaves": "loaf",
+    "knives": "knife",
+    "cookies": "cookie",
+    "brownies": "brownie",
+    "pies": "pie",
+    "chilies": "chili",
+    "chillies": "chilli",
+    "quiches": "quiche",
+    "brioches": "brioche",
+    "ganaches": "ganache",
+}
+# Words that end like plurals but are not
+INVARIANT_WORDS = {"molasses", "grits", "bitters", "schnapps"}
+# Different names for one ingredient: name -> the name recipes and queries are matched
+# on. Either side may be written in the plural; both are canonicalized on import.
+SYNONYMS = {
+    "scallions": "green onions",
+    "spring onions": "green onions",
+    "garbanzo beans": "chickpeas",
+    "confectioners sugar": "powdered sugar",
+    "icing sugar": "powdered sugar",
+    "caster sugar": "superfine sugar",
+    "granulated sugar": "sugar",
+    "white sugar": "sugar",
+    "all-purpose flour": "flour",
+    "plain flour": "flour",
+    "corn starch": "cornstarch",
+    "cornflour": "cornstarch",
+    "bicarbonate of soda": "baking soda",
+    "courgettes": "zucchini",
+    "aubergines": "eggplant",
+    "rocket": "arugula",
+    "capsicum": "bell pepper",
+    "coriander leaves": "cilantro",
+    "fresh coriander": "fresh cilantro",
+    "prawns": "shrimp",
+    "minced beef": "ground beef",
+    "beef mince": "ground beef",
+    "double cream": "heavy cream",
+    "heavy whipping cream": "heavy cream",
+    "single cream": "light cream",
+    "extra virgin olive oil": "olive oil",
+    "chilli": "chili",
+    "chilli peppers": "chili peppers",
+    "table salt": "salt",
+}
+
+_SEPARATORS = re.compile(r"[\s\-_/]+")
+
+
+def singular(word):
+    # English plural -> singular by suffix, for the last word of an ingredient name
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if len(word) < 4 or word in INVARIANT_WORDS or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def _lemma(name):
+    # Lowercase, drop apostrophes, split on whitespace and hyphens, and singularize the
+    # head noun: "Confectioners' Sugar" and "all-purpose flour" match their plain spellings
+    words = _SEPARATORS.split(name.lower().replace("'", "").replace("’", "").strip())
+    words = [word for word in words if word]
+    if words:
+        words[-1] = singular(words[-1])
+    return " ".join(words)
+
+
+_CANONICAL_SYNONYMS = {_lemma(name): _lemma(canonical) for name, canonical in SYNONYMS.items()}
+
+
+def canonical_name(ingredient):
+    # The name an ingredient is matched on: recipes and queries that spell it
+    # differently ("Eggs", "egg") or use a synonym ("scallions") agree on it
+    name = _lemma(ingredient)
+    return _CANONICAL_SYNONYMS.get(name, name)
+
+
+def canonicalize(ingredients, terms):
+    # Term ID of each ingredient string; canonical names seen for the first time are
+    # interned into terms
+    return np.array([terms.intern(canonical_name(ingredient)) for ingredient in ingredients], dtype=np.int32)
+
+
+# The ingredient ID space every index matches on. Each distinct canonical name is a
+# term; term_of maps an ingredient vocabulary ID (a spelling found in the CSV) to its
+# term. Both are compiled at ingest, so resolving a query ingredient that some recipe
+# spells the same way is a single dictionary lookup.
+class IngredientLexicon:
+    def __init__(self, terms, term_of, ingredient_vocab):
+        self.terms = terms
+        self.term_of = term_of
+        self._spellings = dict(zip(ingredient_vocab.strings, term_of.tolist()))
+
+    def term_id(self, ingredient):
+        # The term ID of an ingredient as a user typed it (lowercased and stripped), or
+        # None when no recipe uses it
+        term_id = self._spellings.get(ingredient)
+        if term_id is None:
+            term_id = self.terms.id_of(canonical_name(ingredient))
+        return term_id
+
+    def __len__(self):
+        return len(self.terms)
+
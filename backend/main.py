@@ -1,555 +1,823 @@
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request
 from flask_cors import CORS
-import pandas as pd
-import ast
-import json
+import argparse
+import os
+import sys
+import threading
+import time
+from ingest import ingest_csv
+from cache import LRUCache
+from details import DETAIL_MAX_AGE_SECONDS, DetailStore
+from hashmap import HashMap
+from inverted_index import InvertedIndex
+from lexicon import canonical_name
+from metrics import Metrics, StageTimer, process_memory, render_gauges
+from numeric_index import NUMERIC_FIELDS, NumericIndex
+from pagination import DATA_STRUCTURES, decode_cursor, encode_cursor
+from prefork import PreforkServer
+from scoring import ScoringMatrix
+from search import OPTIONAL_FIELDS, RANGE_FILTERS, SCORED_SORTS, IndexLookups, rank
+from snapshot import classify_source, open_snapshot, source_fingerprint, write_snapshot
+from store import PREDEFINED_TAGS, RecipeStore
+from trie import TOP_K, NameTrie, Trie
 
 app = Flask(__name__)
 CORS(app)
 MAX_INGREDIENTS = 10
 MAX_RESULTS = 30
-PREDEFINED_TAGS = {
-    "vegan", "vegetarian", "gluten-free", "low-carb", "high-protein", "dairy-free",
-    "nut-free", "low-fat", "italian", "mexican", "indian", "chinese", "mediterranean",
-    "american", "thai", "japanese", "breakfast", "lunch", "dinner", "snack", "dessert", 
-    "grilled", "baked", "fried", "roasted", "slow-cooked", "raw", "spicy", "sweet", "savory", 
-    "sour", "salty"
-}
-
-# Trie Data Structure for Ingredient-Based Lookup
-class TrieNode:
-    def __init__(self):
-        self.children = {}
-        self.recipes = []
-
-class Trie:
-    def __init__(self):
-        self.root = TrieNode()
-
-    def insert(self, ingredient, recipe):
-        node = self.root
-        for char in ingredient:
-            if char not in node.children:
-                node.children[char] = TrieNode()
-            node = node.children[char]
-        node.recipes.append(recipe)
-
-    def search(self, ingredient):
-        node = self.root
-        for char in ingredient:
-            if char not in node.children:
-                return []
-            node = node.children[char]
-        return node.recipes
-
-# Trie Data Structure for Name-Based Lookup
-class NameTrie:
-    def __init__(self):
-        self.root = TrieNode()
-
-    def insert(self, name, recipe):
-        if not isinstance(name, str):
-            name = str(name)  
-        if not name.strip():
-            raise ValueError("Recipe name cannot be empty")
-        node = self.root
-        for char in name.lower():  
-            if char not in node.children:
-                node.children[char] = TrieNode()
-            node = node.children[char]
-        node.recipes.append(recipe)
-
-    def search(self, name):
-        node = self.root
-        for char in name.lower():
-            if char not in node.children:
-                return []
-            node = node.children[char]
-        return node.recipes
-
-
-def load_trie(data_file, trie):
-    # Load the dataset
-    recipes_df = pd.read_csv(data_file)
-
-    recipes = []
-    for _, row in recipes_df.iterrows():
-        recipe_name = str(row["name"]) if pd.notna(row["name"]) else "Unnamed Recipe"
-        recipe_name = recipe_name.title()
-        description = row["description"] if pd.notna(row["description"]) and row["description"] != "#NAME?" else "Description not available"
-
-        tags = row["tags"]
-        try:
-            tags = ast.literal_eval(tags) if pd.notna(tags) else []
-            if not isinstance(tags, list):
-                tags = []
-        except (ValueError, SyntaxError):
-            tags = []
-
-        # Ensure 'ingredients' is always a list, even if it's malformed
-        ingredients = row["ingredients"]
-        try:
-            ingredients = ast.literal_eval(ingredients) if pd.notna(ingredients) else []
-            if not isinstance(ingredients, list):
-                ingredients = []
-        except (ValueError, SyntaxError):
-            ingredients = []
-
-        instructions = row["steps"]
-        try:
-            instructions = ast.literal_eval(instructions) if pd.notna(instructions) else []
-            if not isinstance(instructions, list):
-                instructions = []
-        except (ValueError, SyntaxError):
-            instructions = []
-
-        instructions = [sentence.strip().capitalize() if sentence else "" for sentence in instructions]
-
-        # Append the cleaned recipe
-        recipes.append({
-            "name": recipe_name,
-            "total_time": row["minutes"] if pd.notna(row["minutes"]) else "Time not available",
-            "num_steps": row["n_steps"] if pd.notna(row["n_steps"]) else 0,
-            "tags": tags,
-            "description": description,
-            "ingredients": ingredients,
-            "instructions": instructions
-        })
-
-    # Populate the Trie with recipes based on ingredients
-    for recipe in recipes:
-        for ingredient in recipe['ingredients']:
-            trie.insert(ingredient, recipe)
+DATA_FILE = "RAW_recipes.csv"
+SNAPSHOT_FILE = "RAW_recipes.snapshot"
+SEARCH_CACHE_ENTRIES = 10000
+SEARCH_CACHE_BYTES = 64 * 1024 * 1024
+# Page size bounds for /search; MAX_RESULTS is the default page size
+MAX_PAGE_SIZE = 100
+# Ranked match sets of searches that clients page through, so pages after the second
+# are slices rather than a new search
+RANKING_CACHE_ENTRIES = 256
+RANKING_CACHE_BYTES = 128 * 1024 * 1024
+RANKING_TTL_SECONDS = 300
+MAX_BATCH_QUERIES = 1000
+# How often the CSV is checked for appended rows
+REFRESH_INTERVAL_SECONDS = 60
+# Detail bodies of the most viewed recipes, kept in memory in front of the detail file
+DETAIL_CACHE_ENTRIES = 4096
+DETAIL_CACHE_BYTES = 16 * 1024 * 1024
+
+
+def load_trie(store, trie, start=0):
+    # Index every recipe ID (from row start on) under the canonical name of each of its
+    # ingredients, so the trie matches on the same terms as the inverted index
+    offsets, recipe_ids = store.term_postings(start)
+    for term_id, term in enumerate(store.lexicon.terms.strings):
+        if term and offsets[term_id + 1] > offsets[term_id]:
+            trie.insert_all(term, recipe_ids[offsets[term_id]:offsets[term_id + 1]].tolist())
+    # Popularity of an ingredient completion is the number of recipes using it
+    trie.finalize()
+    return trie
+
+
+def load_nameTrie(store, trie, start=0):
+    name_trie = trie
+    for recipe_id in range(start, len(store)):
+        name_trie.insert(store.name(recipe_id).lower(), recipe_id)
+    name_trie.finalize()
+    return name_trie
 
-    return recipes
 
+# Function to load recipes into the HashMap
+def load_hashmap(store, recipe_map=None, start=0):
+    # Recipe data lives in the store; the map resolves a recipe ID to its row
+    recipe_map = recipe_map if recipe_map is not None else HashMap()
+    recipe_map.bulk_insert([(recipe_id, recipe_id) for recipe_id in range(start, len(store))])
+    return recipe_map
 
-def load_nameTrie(data_file, trie):
-    # Read the CSV file into a DataFrame
-    recipes_df = pd.read_csv(data_file)
 
-    name_trie = trie
+def normalize_name(name):
+    return " ".join(name.lower().split())
+
+
+# Secondary HashMap from normalized recipe name to recipe ID. When several recipes
+# share a name, the one listed first in the CSV (lowest ID) wins, matching NameTrie.
+def load_name_map(store, name_map=None, start=0):
+    name_map = name_map if name_map is not None else HashMap()
+    # Insert in reverse so the lowest ID is written last for duplicate names
+    items = [
+        (normalize_name(store.name(recipe_id)), recipe_id)
+        for recipe_id in range(len(store) - 1, start - 1, -1)
+    ]
+    if start:
+        # Names already mapped belong to older, lower-ID recipes
+        items = [(name, recipe_id) for name, recipe_id in items if name_map.get(name) is None]
+    name_map.bulk_insert(items)
+    return name_map
+
+
+# One generation of the recipe store and every index built over it. A generation is
+# never modified once it is published: refreshes build the next one and the registry
+# swaps it in with a single reference assignment, so every request runs against one
+# complete generation even while another is being built.
+class Indexes:
+    def __init__(self, store, trie, name_trie, recipe_map, name_map, ingredient_index, scoring, details,
+                 numeric_indexes):
+        self.store = store
+        self.trie = trie
+        self.name_trie = name_trie
+        self.recipe_map = recipe_map
+        self.name_map = name_map
+        self.ingredient_index = ingredient_index
+        self.scoring = scoring
+        self.details = details
+        self.numeric_indexes = numeric_indexes  # column -> NumericIndex, see NUMERIC_FIELDS
+        # Set by the registry before the generation is published
+        self.generation = None
+        self.source = None
+        self.fingerprint = None  # the CSV content this generation covers
+        self.build_seconds = None
+        self.ingest_rows_per_second = None
+
+
+# Build every index from the columnar recipe store and its cold detail tier
+def build_indexes(store, details):
+    trie = load_trie(store, Trie())
+    name_trie = load_nameTrie(store, NameTrie())
+    recipe_map = load_hashmap(store)
+    name_map = load_name_map(store)
+    ingredient_index = InvertedIndex.from_store(store)
+    scoring = ScoringMatrix.from_index(ingredient_index, len(store))
+    numeric_indexes = {field: NumericIndex.from_values(getattr(store, field)) for field in NUMERIC_FIELDS}
+    return Indexes(store, trie, name_trie, recipe_map, name_map, ingredient_index, scoring, details,
+                   numeric_indexes)
+
+
+# The next generation after appending parsed rows: only the new rows are inserted, into
+# forks and copies of the current structures, so the current generation stays intact
+def extend_indexes(indexes, parsed):
+    start = len(indexes.store)
+    store, cold = indexes.store.extended(parsed)
+    trie = load_trie(store, indexes.trie.fork(), start)
+    name_trie = load_nameTrie(store, indexes.name_trie.fork(), start)
+    recipe_map = load_hashmap(store, indexes.recipe_map.copy(), start)
+    name_map = load_name_map(store, indexes.name_map.copy(), start)
+    ingredient_index = indexes.ingredient_index.extended(store, start)
+    scoring = ScoringMatrix.from_index(ingredient_index, len(store))
+    details = indexes.details.extended(store, cold)
+    numeric_indexes = {
+        field: index.extended(getattr(store, field), start) for field, index in indexes.numeric_indexes.items()
+    }
+    return Indexes(store, trie, name_trie, recipe_map, name_map, ingredient_index, scoring, details,
+                   numeric_indexes)
+
+
+def details_path(snapshot_file):
+    # The cold detail file sits next to its snapshot: RAW_recipes.snapshot -> RAW_recipes.details
+    return os.path.splitext(snapshot_file)[0] + ".details"
+
+
+# Parse the CSV into a recipe store and its detail file, and write a snapshot for the next start
+def compile_snapshot(data_file, snapshot_file):
+    # Fingerprint before parsing and parse only the fingerprinted bytes, which end at
+    # the last complete row, so rows appended mid-build (or half-written when the build
+    # starts) are left for the next refresh
+    fingerprint = source_fingerprint(data_file)
+    parsed = ingest_csv(data_file, end=fingerprint["size"])
+    store, cold = RecipeStore.from_ingest(parsed)
+    details = DetailStore.create(details_path(snapshot_file), store, cold, detail_cache)
+    save_snapshot(snapshot_file, fingerprint, store, details)
+    return store, details, parsed, fingerprint
+
+
+def save_snapshot(snapshot_file, fingerprint, store, details):
+    try:
+        write_snapshot(snapshot_file, fingerprint, {**store.to_sections(), **details.to_sections()})
+    except OSError as e:
+        print(f"Error: could not write snapshot {snapshot_file}: {e}")
 
-    for _, row in recipes_df.iterrows():
-        name = str(row["name"]).strip() if pd.notna(row["name"]) else "Unnamed Recipe"
-        name = name.title()
-        
-        if not name:
-            continue
-        
-        tags = row["tags"]
-        try:
-            tags = ast.literal_eval(tags) if pd.notna(tags) else []
-            if not isinstance(tags, list):
-                tags = []
-        except (ValueError, SyntaxError):
-            tags = []  
 
-        ingredients = row["ingredients"]
+def load_snapshot_store(snapshot_file, data_file):
+    # Returns (store, details, fingerprint of the CSV it was compiled from), or None
+    snapshot = open_snapshot(snapshot_file, data_file)
+    if snapshot is None:
+        return None
+    try:
+        # The store's columns are views into the snapshot's memory map, so it stays open
+        store = RecipeStore.from_snapshot(snapshot)
+        details = DetailStore.from_snapshot(snapshot, details_path(snapshot_file), detail_cache)
+        return store, details, snapshot.source
+    except (KeyError, ValueError, OSError) as e:
+        print(f"Ignoring snapshot {snapshot_file}: {e}")
+        return None
+
+
+# Owns the live index generation. The first build runs in the background on startup;
+# after that refresh() picks up changes to the CSV, either from a watcher thread that
+# polls the file or on request, and publishes each new generation atomically.
+class IndexRegistry:
+    def __init__(self, data_file=DATA_FILE, snapshot_file=SNAPSHOT_FILE, watch_interval=None):
+        self.data_file = data_file
+        self.snapshot_file = snapshot_file
+        self.watch_interval = watch_interval
+        self.current = None  # the live Indexes generation
+        self.error = None
+        self.last_refresh = None
+        # In a forked worker, asks the process that owns the registry to refresh instead
+        self.refresh_requester = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # Kick off the build in the background; safe to call more than once
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="index-build", daemon=True)
+                self._thread.start()
+
+    def add_listener(self, callback):
+        # callback() runs after every new generation is published
+        self._listeners.append(callback)
+
+    def _publish(self, indexes, started):
+        previous = self.current
+        indexes.generation = previous.generation + 1 if previous is not None else 1
+        indexes.build_seconds = time.perf_counter() - started
+        self.current = indexes
+        for callback in self._listeners:
+            callback()
+
+    def _build_all(self):
+        # Prefer the compiled snapshot; rebuild from the CSV only when it is missing or stale
+        loaded = load_snapshot_store(self.snapshot_file, self.data_file)
+        if loaded is not None:
+            store, details, fingerprint = loaded
+            indexes = build_indexes(store, details)
+            indexes.source = "snapshot"
+        else:
+            store, details, parsed, fingerprint = compile_snapshot(self.data_file, self.snapshot_file)
+            indexes = build_indexes(store, details)
+            indexes.source = "csv"
+            indexes.ingest_rows_per_second = parsed.rows_per_second
+        indexes.fingerprint = fingerprint
+        return indexes
+
+    def _run(self):
+        started = time.perf_counter()
         try:
-            ingredients = ast.literal_eval(ingredients) if pd.notna(ingredients) else []
-            if not isinstance(ingredients, list):
-                ingredients = []
-        except (ValueError, SyntaxError):
-            ingredients = []  
-
-        instructions = row["steps"]
+            self._publish(self._build_all(), started)
+        except Exception as e:
+            # Keep watching: the next refresh builds the first generation once the
+            # CSV is readable (e.g. after it has been downloaded)
+            self.error = str(e)
+            print(f"Error: index build failed: {e}")
+        finally:
+            self._ready.set()
+        while self.watch_interval:
+            time.sleep(self.watch_interval)
+            self.refresh()
+
+    def refresh(self):
+        # Bring the indexes up to date with the CSV. Appended rows are applied to the
+        # current generation's structures; any other change rebuilds everything. Runs
+        # in the calling thread and returns a summary; a refresh already in progress
+        # makes this a no-op.
+        if not self._refresh_lock.acquire(blocking=False):
+            return {"status": "busy"}
+        started = time.perf_counter()
         try:
-            instructions = ast.literal_eval(instructions) if pd.notna(instructions) else []
-            if not isinstance(instructions, list):
-                instructions = []
-        except (ValueError, SyntaxError):
-            instructions = []  
-
-        description = row["description"] if pd.notna(row["description"]) and row["description"] != "#NAME?" else "Description not available"
-        
-        description = '. '.join([sentence.strip().capitalize() if sentence else "" for sentence in description.split('. ')])
-
-
-        instructions = [sentence.strip().capitalize() if sentence else "" for sentence in instructions]
-
-        recipe = {
-            "name": name,
-            "total_time": row["minutes"] if pd.notna(row["minutes"]) else "Time not available",
-            "num_steps": row["n_steps"] if pd.notna(row["n_steps"]) else 0,
-            "tags": tags,
-            "description": description,
-            "ingredients": ingredients,
-            "instructions": instructions
-        }
-
-
-        name_trie.insert(name.lower(), recipe)
-
-    # Return the populated name_trie
-    return name_trie
-
-# HashMap Data Structure 
-class HashMap:
-    def __init__(self, size=1000):
-        self.size = size
-        self.table = [[] for _ in range(size)]
-        self.count = 0  # Track the number of elements for efficient resizing
-
-    def hash_function(self, key):
-        hash_value = 0
-        prime = 101 
-        for char in str(key):
-            hash_value = (hash_value * prime + ord(char)) & 0x7FFFFFFF  # Limit to 32 bits
-        return hash_value % self.size
-
-    def binary_search(self, bucket, key):
-        low, high = 0, len(bucket) - 1
-        while low <= high:
-            mid = (low + high) // 2
-            if bucket[mid][0] == key:
-                return mid  
-            elif bucket[mid][0] < key:
-                low = mid + 1
+            current = self.get()
+            if current is None:
+                # The first build failed; retry it only once the CSV is there
+                if not os.path.exists(self.data_file):
+                    return {"status": "unavailable"}
+                change = "built"
             else:
-                high = mid - 1
-        return low  # Position to insert if key not found
-
-    def insert(self, key, value):
-        index = self.hash_function(key)
-        bucket = self.table[index]
-        pos = self.binary_search(bucket, key)
-        if pos < len(bucket) and bucket[pos][0] == key:
-            bucket[pos][1] = value  # Update value if key exists
-        else:
-            bucket.insert(pos, [key, value])  # Insert at the correct position
-            self.count += 1
-            if self.count / self.size > 0.7:  # Resize if load factor > 0.7
-                self.resize()
-
-    def get(self, key):
-        index = self.hash_function(key)
-        bucket = self.table[index]
-        pos = self.binary_search(bucket, key)
-        if pos < len(bucket) and bucket[pos][0] == key:
-            return bucket[pos][1]
-        return None  # Key not found
-
-    def delete(self, key):
-        index = self.hash_function(key)
-        bucket = self.table[index]
-        pos = self.binary_search(bucket, key)
-        if pos < len(bucket) and bucket[pos][0] == key:
-            del bucket[pos]
-            self.count -= 1
+                change, fingerprint = classify_source(current.fingerprint, self.data_file)
+            if change == "unchanged":
+                return {"status": "unchanged"}
+
+            if change == "appended":
+                parsed = ingest_csv(self.data_file, start=current.fingerprint["size"], end=fingerprint["size"])
+                indexes = extend_indexes(current, parsed)
+                indexes.source = "csv-append"
+                indexes.fingerprint = fingerprint
+                indexes.ingest_rows_per_second = parsed.rows_per_second
+                self._publish(indexes, started)
+                save_snapshot(self.snapshot_file, fingerprint, indexes.store, indexes.details)
+                result = {"status": "appended", "rows_added": parsed.rows}
+            else:
+                self._publish(self._build_all(), started)
+                self.error = None
+                result = {"status": "built" if current is None else "rebuilt"}
+            result["recipes"] = len(self.current.store)
+            result["seconds"] = round(time.perf_counter() - started, 3)
+            self.last_refresh = result
+            return result
+        except Exception as e:
+            # The live generation is untouched; the next refresh tries again
+            self.last_refresh = {"status": "error", "error": str(e)}
+            print(f"Error: index refresh failed: {e}")
+            return self.last_refresh
+        finally:
+            self._refresh_lock.release()
+
+    def refresh_in_background(self):
+        # Returns False when a refresh is already running
+        if self.refresh_requester is not None:
+            self.refresh_requester()
             return True
-        return False  # Key not found
-
-    def get_all_items(self):
-        items = []
-        for bucket in self.table:
-            for pair in bucket:
-                items.append(pair)
-        return items
-
-    def resize(self):
-        old_table = self.table
-        self.size *= 2
-        self.table = [[] for _ in range(self.size)]
-        for bucket in old_table:
-            for key, value in bucket:
-                index = self.hash_function(key)
-                self.table[index].append([key, value])  
-
-    def bulk_insert(self, items):
-        for key, value in items:
-            self.insert(key, value)
-
-def format_title(title):
-    return ' '.join(word.capitalize() for word in title.split())
-
-def format_description(description):
-    if description:
-        return description[0].capitalize() + description[1:] if len(description) > 1 else description.capitalize()
-    return None
-
-def capitalize_steps(steps):
-    return [f"{step.strip().capitalize()}" for i, step in enumerate(steps)]
-
-def capitalize_ingredients(ingredients):
-    return [ingredient.strip().capitalize() for ingredient in ingredients]
-
-# Function to load recipes into the HashMap
-def load_hashmap():
-    file_path = 'RAW_recipes.csv'  
-    try:
-        df = pd.read_csv(file_path, low_memory=False)
-    except FileNotFoundError:
-        print(f"Error: The file {file_path} does not exist.")
-        return
-    except pd.errors.EmptyDataError:
-        print(f"Error: The file {file_path} is empty.")
-        return
+        if self._refresh_lock.locked():
+            return False
+        threading.Thread(target=self.refresh, name="index-refresh", daemon=True).start()
+        return True
+
+    def get(self, timeout=None):
+        # Block until the first generation is built (building it on first use if
+        # needed) and return the live one; None if the build failed
+        self.start()
+        if not self._ready.wait(timeout):
+            return None
+        return self.current
+
+    def status(self):
+        self.start()
+        if not self._ready.is_set():
+            return {"status": "building"}
+        indexes = self.current
+        if indexes is None:
+            return {"status": "error", "error": self.error}
+        rows_per_second = indexes.ingest_rows_per_second
+        return {
+            "status": "ready",
+            "generation": indexes.generation,
+            "build_seconds": round(indexes.build_seconds, 3),
+            "source": indexes.source,
+            "ingest_rows_per_second": round(rows_per_second) if rows_per_second else None,
+            "recipes": len(indexes.store),
+            "store_bytes": indexes.store.nbytes,
+            "last_refresh": self.last_refresh,
+            "search_cache": search_cache.stats(),
+            "ranking_cache": ranking_cache.stats(),
+            "detail_cache": detail_cache.stats(),
+        }
 
-    recipe_map = HashMap(size=1000)
 
-    for index, row in df.iterrows():
+registry = IndexRegistry(watch_interval=REFRESH_INTERVAL_SECONDS)
+
+# Cached /search responses, keyed by the normalized request; emptied on every rebuild
+search_cache = LRUCache(max_entries=SEARCH_CACHE_ENTRIES, max_bytes=SEARCH_CACHE_BYTES)
+registry.add_listener(search_cache.clear)
+# Full rankings behind paginated searches, keyed like the response cache minus the page
+ranking_cache = LRUCache(
+    max_entries=RANKING_CACHE_ENTRIES, max_bytes=RANKING_CACHE_BYTES, ttl=RANKING_TTL_SECONDS
+)
+registry.add_listener(ranking_cache.clear)
+# Keyed by detail file content, so new generations need not clear it
+detail_cache = LRUCache(max_entries=DETAIL_CACHE_ENTRIES, max_bytes=DETAIL_CACHE_BYTES)
+
+
+def indexes_unavailable():
+    return jsonify({"error": "Recipe indexes are not available"}), 503
+
+
+def detail_response(details, recipe_id):
+    # The body was serialized when the indexes were built; a client or CDN that
+    # already holds it (If-None-Match) gets an empty 304 instead
+    response = app.response_class(details.body(recipe_id), mimetype="application/json")
+    response.set_etag(details.etag(recipe_id))
+    response.cache_control.public = True
+    response.cache_control.max_age = DETAIL_MAX_AGE_SECONDS
+    response.make_conditional(request)
+    g.timer.mark("materialize")
+    return response
+
+
+# Every request is timed stage by stage: handlers mark stages on g.timer as they go,
+# and the totals go out in a Server-Timing header and into the /metrics histograms
+metrics = Metrics()
+metrics.describe("gatorbites_request_duration_seconds", "Request latency by route and data structure")
+metrics.describe("gatorbites_stage_duration_seconds", "Time spent in each request stage")
+
+
+@app.before_request
+def start_timer():
+    g.timer = StageTimer()
+    g.data_structure = None
+
+
+@app.after_request
+def record_timing(response):
+    timer = g.get("timer")
+    if timer is None:
+        return response
+    elapsed = timer.elapsed()
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    data_structure = g.get("data_structure") or "none"
+    metrics.observe(
+        "gatorbites_request_duration_seconds",
+        (("route", route), ("data_structure", data_structure), ("status", str(response.status_code))),
+        elapsed,
+    )
+    for stage, seconds in timer.stages.items():
+        metrics.observe(
+            "gatorbites_stage_duration_seconds",
+            (("route", route), ("data_structure", data_structure), ("stage", stage)),
+            seconds,
+        )
+    response.headers["Server-Timing"] = timer.server_timing()
+    return response
+
+
+# Prometheus scrape endpoint: latency histograms plus index, memory and cache figures
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    lines = metrics.render_histograms()
+    indexes = registry.current
+    lines += render_gauges("gatorbites_index_ready", "gauge", "1 once the indexes can serve searches",
+                           [((), int(indexes is not None))])
+    if indexes is not None:
+        lines += render_gauges("gatorbites_index_generation", "gauge", "Generation number of the live indexes",
+                               [((), indexes.generation)])
+        lines += render_gauges("gatorbites_index_build_seconds", "gauge", "Time taken to build the live indexes",
+                               [((), indexes.build_seconds)])
+        lines += render_gauges("gatorbites_ingest_rows_per_second", "gauge",
+                               "CSV ingestion throughput of the live indexes' build",
+                               [((), indexes.ingest_rows_per_second)])
+        lines += render_gauges("gatorbites_index_recipes", "gauge", "Recipes in the store",
+                               [((), len(indexes.store))])
+        lines += render_gauges("gatorbites_store_bytes", "gauge", "Bytes held by the recipe store's columns",
+                               [((), indexes.store.nbytes)])
+        lines += render_gauges("gatorbites_detail_index_bytes", "gauge",
+                               "Bytes held in memory to locate recipe detail responses",
+                               [((), indexes.details.nbytes)])
+        lines += render_gauges("gatorbites_detail_file_bytes", "gauge",
+                               "Size of the pre-serialized recipe detail responses on disk",
+                               [((), indexes.details.file_bytes)])
+        lines += render_gauges("gatorbites_numeric_index_bytes", "gauge",
+                               "Bytes held by the sorted indexes over numeric recipe fields",
+                               [((), sum(index.nbytes for index in indexes.numeric_indexes.values()))])
+        lines += render_gauges("gatorbites_index_entries", "gauge", "Entries in each index", [
+            ((("index", "ingredient_vocab"),), len(indexes.store.ingredient_vocab)),
+            ((("index", "ingredient_terms"),), len(indexes.ingredient_index)),
+            ((("index", "tag_vocab"),), len(indexes.store.tag_vocab)),
+            ((("index", "recipe_map"),), len(indexes.recipe_map)),
+            ((("index", "name_map"),), len(indexes.name_map)),
+        ])
+    lines += render_gauges("gatorbites_process_resident_bytes", "gauge", "Resident memory of this process",
+                           [((), process_memory())])
+
+    caches = (
+        ("search", search_cache.stats()), ("ranking", ranking_cache.stats()), ("detail", detail_cache.stats()),
+    )
+    for stat, kind, text in (
+        ("entries", "gauge", "Entries held"),
+        ("bytes", "gauge", "Approximate bytes held"),
+        ("hits", "counter", "Lookups answered from the cache"),
+        ("misses", "counter", "Lookups that missed"),
+        ("evictions", "counter", "Entries evicted to stay within bounds"),
+    ):
+        name = f"gatorbites_cache_{stat}" + ("_total" if kind == "counter" else "")
+        lines += render_gauges(name, kind, text, [((("cache", cache),), stats[stat]) for cache, stats in caches])
+    return app.response_class("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+# Check the CSV for changes now instead of waiting for the watcher; the refresh runs
+# in the background and its outcome shows up as last_refresh on /ready
+@app.route('/refresh', methods=['POST'])
+def refresh_indexes():
+    # Also allowed after a failed first build, to retry it
+    if registry.status()["status"] == "building":
+        return indexes_unavailable()
+    if not registry.refresh_in_background():
+        return jsonify({"error": "A refresh is already running"}), 409
+    return jsonify({"status": "refresh started"}), 202
+
+
+# Readiness probe: 200 once the indexes have been built, 503 until then
+@app.route('/ready', methods=['GET'])
+def ready():
+    status = registry.status()
+    return jsonify(status), 200 if status["status"] == "ready" else 503
+
+
+def json_body(payload):
+    # Compact JSON bytes, even in debug mode, so bodies can be cached and embedded as NDJSON lines
+    return app.json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def parse_search_query(data):
+    # Validates one /search request body. Returns (query, None) or (None, (error, status)).
+    if not isinstance(data, dict) or ('ingredients' not in data and 'tags' not in data and 'cursor' not in data):
+        return None, ("Ingredients or tags are required", 400)
+
+    limit = data.get('limit', MAX_RESULTS)
+    if type(limit) is not int or not 1 <= limit <= MAX_PAGE_SIZE:
+        return None, (f"limit must be an integer from 1 to {MAX_PAGE_SIZE}", 400)
+
+    # A cursor carries the query it continues; anything else in the body but limit is ignored
+    if 'cursor' in data:
         try:
-            # Extract recipe details
-            recipe_name = str(row['name']).strip() if pd.notnull(row['name']) else "Unnamed Recipe"
-            recipe_name = format_title(recipe_name)  
-
-            total_time = int(row['minutes']) if pd.notnull(row['minutes']) else 0
-            date_submitted = str(row['submitted']).strip() if pd.notnull(row['submitted']) else "Unknown"
-            description = str(row['description']).strip() if pd.notnull(row['description']) else None
-            description = format_description(description)  
-            tags = []
-            if pd.notnull(row['tags']):
-                try:
-                    tags = json.loads(row['tags'].replace("'", "\""))
-                except json.JSONDecodeError:
-                    tags = []  
-
-            ingredients = []
-            if pd.notnull(row['ingredients']):
-                try:
-                    ingredients = json.loads(row['ingredients'].replace("'", "\""))
-                    ingredients = capitalize_ingredients(ingredients)  
-                except json.JSONDecodeError:
-                    ingredients = []  
-
-            instructions = []
-            if pd.notnull(row['steps']):
-                try:
-                    instructions = json.loads(row['steps'].replace("'", "\""))
-                    instructions = capitalize_steps(instructions)  
-                except json.JSONDecodeError:
-                    instructions = []  
-
-            # Number of steps and ingredients
-            num_steps = int(row['n_steps']) if pd.notnull(row['n_steps']) else len(instructions)
-            num_ingredients = int(row['n_ingredients']) if pd.notnull(row['n_ingredients']) else len(ingredients)
-
-            recipe_map.insert(index, {
-                "name": recipe_name,
-                "total_time": total_time,
-                "date_submitted": date_submitted,
-                "description": description,
-                "tags": tags,
-                "ingredients": ingredients,
-                "instructions": instructions,
-                "num_steps": num_steps,
-                "num_ingredients": num_ingredients
-            })
+            generation, user_ingredients, user_tags, sort_by, data_structure, ranges, fields, offset = (
+                decode_cursor(data['cursor'])
+            )
+        except ValueError:
+            return None, ("Invalid cursor", 400)
+        return (generation, user_ingredients, user_tags, sort_by, data_structure, ranges, fields, offset, limit), None
+
+    ingredients, tags = data.get('ingredients', []), data.get('tags', [])
+    if not isinstance(ingredients, list) or not all(isinstance(ing, str) for ing in ingredients):
+        return None, ("ingredients must be a list of strings", 400)
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        return None, ("tags must be a list of strings", 400)
+
+    user_ingredients = set(ing.lower().strip() for ing in ingredients[:MAX_INGREDIENTS])
+    user_ingredients.discard("")
+
+    user_tags = set(tag.lower().strip() for tag in tags)
+    invalid_tags = user_tags - PREDEFINED_TAGS
+    if invalid_tags:
+        return None, (f"Invalid tags provided: {', '.join(invalid_tags)}", 400)
 
-        except Exception as e:
-            continue
+    # Tag-only searches are allowed; an empty query is not
+    if not user_ingredients and not user_tags:
+        return None, ("No ingredients or tags provided", 400)
 
-    return recipe_map
+    sort_by = data.get('sort_by', 'matched_ingredients')
+    if not isinstance(sort_by, str):
+        return None, ("sort_by must be a string", 400)
+    data_structure = data.get('data_structure', 'hashmap')
+    if not isinstance(data_structure, str) or data_structure.lower() not in DATA_STRUCTURES:
+        return None, ("Invalid data structure", 400)
+    data_structure = data_structure.lower()
+
+    # Results are summaries unless the request asks for more fields
+    fields = data.get('fields', [])
+    if not isinstance(fields, list) or not all(isinstance(field, str) and field in OPTIONAL_FIELDS for field in fields):
+        return None, (f"fields must be a list drawn from: {', '.join(OPTIONAL_FIELDS)}", 400)
+    fields = tuple(sorted(set(fields)))
+
+    # Inclusive bounds on total time, step count and ingredient count
+    for key in RANGE_FILTERS:
+        value = data.get(key)
+        if value is not None and (type(value) is not int or value < 0):
+            return None, (f"{key} must be a non-negative integer", 400)
+    ranges = tuple((key, data[key]) for key in sorted(RANGE_FILTERS) if data.get(key) is not None)
+
+    return (None, user_ingredients, user_tags, sort_by, data_structure, ranges, fields, 0, limit), None
+
+
+def run_search(indexes, query, lookups=None, timer=None):
+    # Returns the serialized response body and status for a validated query
+    generation, user_ingredients, user_tags, sort_by, data_structure, ranges, fields, offset, limit = query
+    if generation is not None and generation != indexes.generation:
+        return json_body({"error": "Cursor expired because the recipe indexes were rebuilt; repeat the search"}), 410
+
+    # Requests that normalize to the same ingredient set, tags and options share an entry;
+    # the generation keeps a response computed against replaced indexes from being served
+    query_key = (
+        indexes.generation, tuple(sorted(user_ingredients)), tuple(sorted(user_tags)),
+        sort_by, data_structure, ranges,
+    )
+    cache_key = query_key + (fields, offset, limit)
+    cached = search_cache.get(cache_key)
+    # Only cursor requests (generation set) can find their ranking cached
+    ranking = ranking_cache.get(query_key) if cached is None and generation is not None else None
+    if timer is not None:
+        timer.mark("cache")
+    if cached is not None:
+        return cached
+
+    if ranking is None:
+        ranking = rank(indexes, user_ingredients, user_tags, sort_by, data_structure, lookups, timer, ranges)
+        # Most searches never get past their first page, so a ranking is only kept once
+        # a client follows its cursor, and only while pages remain after this one
+        if generation is not None and len(ranking) > offset + limit:
+            ranking_cache.put(query_key, ranking, ranking.approx_bytes)
+
+    if not len(ranking):
+        result = (json_body({"message": "No recipes found for the given ingredients."}), 404)
+    else:
+        next_offset = offset + limit
+        next_cursor = None
+        if next_offset < len(ranking):
+            next_cursor = encode_cursor(
+                indexes.generation, user_ingredients, user_tags, sort_by, data_structure, ranges, fields,
+                next_offset,
+            )
+        result = (json_body({
+            "total_matches": len(ranking),
+            "recipes": ranking.page(indexes, offset, limit, fields, timer),
+            "next_cursor": next_cursor,
+        }), 200)
+    if timer is not None:
+        timer.mark("serialize")
+
+    search_cache.put(cache_key, result, len(result[0]))
+    return result
 
 
 # Search recipes based on user input
 @app.route('/search', methods=['POST'])
 def search_recipes():
+    query, error = parse_search_query(request.get_json())
+    g.timer.mark("parse")
+    if error:
+        message, status = error
+        return jsonify({"error": message}), status
+    g.data_structure = query[4]
+
+    indexes = registry.get()
+    if indexes is None:
+        return indexes_unavailable()
+
+    body, status = run_search(indexes, query, timer=g.timer)
+    return app.response_class(body, status=status, mimetype="application/json")
+
+
+@app.route('/search/batch', methods=['POST'])
+def search_batch():
+    # Runs many /search bodies in one request: {"queries": [...], "stream": false}.
+    # Each result is {"status": ..., "result": ...} where result is what /search would
+    # have returned, in query order; one bad query does not fail the others.
     data = request.get_json()
+    queries = data.get('queries') if isinstance(data, dict) else None
+    if not isinstance(queries, list) or not queries:
+        return jsonify({"error": "A non-empty list of queries is required"}), 400
+    if len(queries) > MAX_BATCH_QUERIES:
+        return jsonify({"error": f"At most {MAX_BATCH_QUERIES} queries per batch"}), 400
+
+    indexes = registry.get()
+    if indexes is None:
+        return indexes_unavailable()
+
+    parsed = [parse_search_query(query) for query in queries]
+    g.timer.mark("parse")
+    # Stages are only timed when the whole batch is answered before the response is sent
+    timer = None if data.get('stream') else g.timer
+    # Trie paths and posting lists are shared by every query in the batch, and all
+    # queries ranked by score are scored together in one matrix-matrix product
+    lookups = IndexLookups(indexes)
+    lookups.prefetch_scores(
+        query[1] for query, error in parsed if not error and query[1] and query[3] in SCORED_SORTS
+    )
+
+    def results():
+        done = {}  # identical queries are answered once
+        for query, error in parsed:
+            if error:
+                message, status = error
+                body = json_body({"error": message})
+            else:
+                generation, user_ingredients, user_tags, *options = query
+                key = (generation, tuple(sorted(user_ingredients)), tuple(sorted(user_tags)), *options)
+                if key not in done:
+                    done[key] = run_search(indexes, query, lookups, timer)
+                body, status = done[key]
+            yield b'{"status":%d,"result":%s}' % (status, body)
+
+    if data.get('stream'):
+        # NDJSON: one line per query, sent as soon as that query is answered
+        lines = (line + b"\n" for line in results())
+        return app.response_class(lines, mimetype="application/x-ndjson")
+    body = b'{"results":[' + b",".join(results()) + b']}'
+    return app.response_class(body, mimetype="application/json")
+
+def autocomplete_params():
+    prefix = request.args.get('q', '').lower().lstrip()
+    try:
+        limit = int(request.args.get('limit', TOP_K))
+    except ValueError:
+        limit = TOP_K
+    return prefix, max(1, min(limit, TOP_K))
+
+
+# Typeahead for the ingredient search box, most widely used ingredients first
+@app.route('/autocomplete/ingredients', methods=['GET'])
+def autocomplete_ingredients():
+    prefix, limit = autocomplete_params()
+    if not prefix:
+        return jsonify({"query": prefix, "completions": []})
+
+    indexes = registry.get()
+    if indexes is None:
+        return indexes_unavailable()
+
+    # Completions are canonical names; a prefix spelled another way ("tomatoes") is
+    # retried in canonical form
+    completions = indexes.trie.prefix_search(prefix, limit)
+    if not completions:
+        completions = indexes.trie.prefix_search(canonical_name(prefix), limit)
+    return jsonify({
+        "query": prefix,
+        "completions": [{"ingredient": ingredient, "recipes": count} for ingredient, count in completions]
+    })
 
-    if not data or 'ingredients' not in data:
-        return jsonify({"error": "Ingredients are required"}), 400
-
-    
-    user_ingredients = set(ing.lower().strip() for ing in data.get('ingredients', [])[:MAX_INGREDIENTS])
 
-    if not user_ingredients:
-        return jsonify({"error": "No ingredients provided"}), 400
+# Typeahead for recipe names
+@app.route('/autocomplete/names', methods=['GET'])
+def autocomplete_names():
+    prefix, limit = autocomplete_params()
+    if not prefix:
+        return jsonify({"query": prefix, "completions": []})
 
-    user_tags = set(tag.lower().strip() for tag in data.get('tags', []))
-    invalid_tags = user_tags - PREDEFINED_TAGS
-    if invalid_tags:
-        return jsonify({"error": f"Invalid tags provided: {', '.join(invalid_tags)}"}), 400
+    indexes = registry.get()
+    if indexes is None:
+        return indexes_unavailable()
 
-    sort_by = data.get('sort_by', 'matched_ingredients')
-    data_structure = data.get('data_structure', 'hashmap').lower()
-
-    matching_recipes = []
-
-    if data_structure == 'trie':
-        trie = Trie()
-
-        # Load recipes into the Trie
-        data_file = "RAW_recipes.csv"
-        recipes = load_trie(data_file, trie)
-
-        # Aggregate matches for all ingredients
-        matched_recipes = {}
-        for ingredient in user_ingredients:
-            for recipe in trie.search(ingredient):
-                if recipe['name'] not in matched_recipes:
-                    matched_recipes[recipe['name']] = {
-                        'name': recipe['name'],
-                        'description': recipe.get('description', 'Description not available') if recipe.get('description') != "#NAME?" else "Description not available",
-                        'minutes': recipe['total_time'],
-                        'ingredients': recipe['ingredients'],
-                        'num_steps': recipe['num_steps'],
-                        'tags': recipe.get('tags', []), 
-                        'instructions': recipe['instructions'],
-                        'matched_ingredients': set(),
-                    }
-                matched_recipes[recipe['name']]['matched_ingredients'].add(ingredient)
-
-        # Prepare results after filtering
-        results = []
-        for recipe in matched_recipes.values():
-            matched_ingredients = list(recipe['matched_ingredients'])
-            missing_ingredients = [ing for ing in recipe['ingredients'] if ing not in user_ingredients]
-
-            recipe_tags = recipe.get('tags', [])
-
-            matched_tags = [tag for tag in user_tags if tag in recipe_tags]
-
-            # Exclude recipes with no total time or missing tag matches
-            if recipe['minutes'] == 0:
-                continue
-            if user_tags and not matched_tags:
-                continue
-
-            results.append({
-                'name': recipe['name'],
-                'description': recipe['description'],
-                'minutes': recipe['minutes'],
-                'matched_ingredients': matched_ingredients,
-                'missing_ingredients': missing_ingredients,
-                'n_steps': recipe['num_steps'],
-                'matched_tags': matched_tags,
-                'instructions': recipe['instructions'],
-            })
-
-        # Sorting logic
-        if sort_by == "matched_ingredients":
-            results.sort(key=lambda x: len(x["matched_ingredients"]), reverse=True)
-        elif sort_by == "missing_ingredients":
-            results.sort(key=lambda x: len(x["missing_ingredients"]))
-        elif sort_by == "total_time":
-            results.sort(key=lambda x: x["minutes"])
-        elif sort_by == "num_steps":
-            results.sort(key=lambda x: x["n_steps"])
-
-        results = results[:MAX_RESULTS]
-
-        if not results:
-            return jsonify({"message": "No recipes found for the given ingredients."}), 404
-
-        return jsonify({
-            "total_matches": len(results),
-            "recipes": results
-        })
-
-
-    if data_structure == 'hashmap':
-        matching_recipes = []
-
-        recipe_map = load_hashmap()
-
-        # Gather all matching recipes
-        for recipe_id, recipe_data in recipe_map.get_all_items():  # Getting all items from HashMap
-            recipe_ingredients = set(ing.strip().lower() for ing in recipe_data.get('ingredients', []))
-            matched_ingredients = user_ingredients.intersection(recipe_ingredients)
-            matched_tags = user_tags.intersection(set(recipe_data.get('tags', [])))
-
-            # Exclude recipes with zero total_time
-            if recipe_data['total_time'] == 0:
-                continue
-
-            # Check if there are matched ingredients and, if necessary, matched tags
-            if matched_ingredients and (not user_tags or matched_tags):
-                matching_recipes.append({
-                    "name": recipe_data['name'],
-                    "description": recipe_data.get('description', 'Description not available'),
-                    "minutes": recipe_data['total_time'],
-                    "matched_ingredients": list(matched_ingredients),
-                    "missing_ingredients": list(recipe_ingredients - matched_ingredients),
-                    "n_steps": recipe_data['num_steps'],
-                    "matched_tags": list(matched_tags),
-                    "instructions": recipe_data['instructions'],
-                })
-
-        # Sorting logic
-        if sort_by == "matched_ingredients":
-            matching_recipes.sort(key=lambda x: len(x["matched_ingredients"]), reverse=True)
-        elif sort_by == "missing_ingredients":
-            matching_recipes.sort(key=lambda x: len(x["missing_ingredients"]))
-        elif sort_by == "total_time":
-            matching_recipes.sort(key=lambda x: x["minutes"])
-        elif sort_by == "num_steps":
-            matching_recipes.sort(key=lambda x: x["n_steps"])
-
-        matching_recipes = matching_recipes[:MAX_RESULTS]
-
-        if not matching_recipes:
-            return jsonify({"message": "No recipes found for the given ingredients."}), 404
-
-        return jsonify({
-            "total_matches": len(matching_recipes),
-            "recipes": matching_recipes
-        })
+    completions = []
+    for name, count in indexes.name_trie.prefix_search(prefix, limit):
+        recipe_ids = indexes.name_trie.search(name)
+        completions.append({"name": indexes.store.name(recipe_ids[0]), "recipes": count})
+    return jsonify({"query": prefix, "completions": completions})
 
 # Route for Trie-based recipe search
 @app.route('/recipe/trie/<recipe_name>', methods=['GET'])
 def get_recipe_from_trie(recipe_name):
-    print(f"Full URL: {request.url}")
-    
-    name_trie = NameTrie()
-    data_file = "RAW_recipes.csv"  
-    recipes = load_nameTrie(data_file, name_trie)
+    g.data_structure = "trie"
+    indexes = registry.get()
+    if indexes is None:
+        return indexes_unavailable()
+    name_trie = indexes.name_trie
 
     # Search for the recipe in the Trie
-    recipes = name_trie.search(recipe_name.lower())
+    recipe_ids = name_trie.search(recipe_name.lower())
+    g.timer.mark("lookup")
 
-    if not recipes:
+    if not recipe_ids:
         return jsonify({"error": "Recipe not found"}), 404
 
-    recipe = recipes[0]
-    description = recipe.get('description', 'Description not available')
-
-    return jsonify({
-        "name": recipe['name'],
-        "description": description,
-        "minutes": recipe['total_time'],
-        "tags": recipe['tags'],
-        "n_steps": recipe['num_steps'],
-        "steps": recipe.get('instructions', []),
-        "ingredients": recipe['ingredients'],
-        "n_ingredients": len(recipe['ingredients'])
-    })
+    return detail_response(indexes.details, recipe_ids[0])
 
 # Route for HashMap-based recipe search
 @app.route('/recipe/hashmap/<recipe_name>', methods=['GET'])
 def get_recipe_from_hashmap(recipe_name):
-    print(f"Full URL: {request.url}")
-
-    recipe_map = load_hashmap()
-    
-    # Search for the recipe in the hashmap
-    recipe = None
-    for recipe_id, recipe_data in recipe_map.get_all_items():
-        if recipe_data['name'].lower() == recipe_name.lower():
-            recipe = recipe_data
-            break
-
-    if not recipe:
+    g.data_structure = "hashmap"
+    indexes = registry.get()
+    if indexes is None:
+        return indexes_unavailable()
+
+    # Single probe of the name index
+    recipe_id = indexes.name_map.get(normalize_name(recipe_name))
+    g.timer.mark("lookup")
+
+    if recipe_id is None:
         return jsonify({"error": "Recipe not found"}), 404
 
-    description = recipe.get('description', 'Description not available')
+    return detail_response(indexes.details, recipe_id)
 
-    return jsonify({
-        "name": recipe['name'],
-        "description": description,
-        "minutes": recipe['total_time'],
-        "tags": recipe['tags'],
-        "n_steps": recipe['num_steps'],
-        "steps": recipe.get('instructions', []),
-        "ingredients": recipe['ingredients'],
-        "n_ingredients": recipe['num_ingredients']
-    })
+# Route for ID-based recipe lookup, using the IDs returned by /search
+@app.route('/recipe/id/<int:recipe_id>', methods=['GET'])
+def get_recipe_by_id(recipe_id):
+    indexes = registry.get()
+    if indexes is None:
+        return indexes_unavailable()
+
+    row = indexes.recipe_map.get(recipe_id)
+    g.timer.mark("lookup")
+    if row is None:
+        return jsonify({"error": "Recipe not found"}), 404
+
+    return detail_response(indexes.details, row)
 
 # Default route for invalid data structure
 @app.route('/recipe/<recipe_name>', methods=['GET'])
 def handle_invalid_data_structure(recipe_name):
     return jsonify({"error": "Invalid data structure"}), 400
 
+# Production mode: build the indexes once in this process, then fork workers that
+# share them copy-on-write. The watcher keeps running here; each new generation is
+# served by a fresh set of workers forked from it.
+def serve(host, port, workers, result_caches=True):
+    registry.start()
+    indexes = registry.get()
+    if indexes is None:
+        print(f"Error: index build failed: {registry.error}")
+        return 1
+    server = PreforkServer(
+        app, host, port, workers,
+        generation=lambda: registry.current.generation,
+        on_hup=registry.refresh_in_background,
+    )
+
+    def post_fork():
+        registry.refresh_requester = server.notify_master
+        # Each worker caches its own responses; split the budgets so the caches take
+        # the same memory in total as in a single process
+        for cache in (search_cache, ranking_cache, detail_cache):
+            cache.max_bytes //= server.worker_count
+        if not result_caches:
+            # Every search does the full work, e.g. to measure what it costs the workers
+            search_cache.max_bytes = ranking_cache.max_bytes = 0
+
+    server.post_fork = post_fork
+    print(f"Serving {len(indexes.store):,} recipes on http://{host}:{port} with {server.worker_count} workers")
+    server.serve_forever()
+    return 0
+
+
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # `python main.py compile [csv] [snapshot]` writes the snapshot without serving
+    if len(sys.argv) > 1 and sys.argv[1] == "compile":
+        data_file = sys.argv[2] if len(sys.argv) > 2 else DATA_FILE
+        snapshot_file = sys.argv[3] if len(sys.argv) > 3 else SNAPSHOT_FILE
+        started = time.perf_counter()
+        compile_snapshot(data_file, snapshot_file)
+        print(f"Compiled {snapshot_file} in {time.perf_counter() - started:.1f}s")
+        sys.exit(0)
+
+    # `python main.py serve [--workers N] [--host HOST] [--port PORT] [--no-result-cache]`
+    # runs the multi-process server
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        parser = argparse.ArgumentParser(prog="main.py serve")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=5000)
+        parser.add_argument("--no-result-cache", dest="result_caches", action="store_false",
+                            help="do not cache /search responses and rankings")
+        args = parser.parse_args(sys.argv[2:])
+        sys.exit(serve(args.host, args.port, args.workers, args.result_caches))
+
+    # Under the debug reloader only the serving child process builds the indexes
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        registry.start()
+    app.run(debug=True)
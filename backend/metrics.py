@@ -0,0 +1,117 @@
+from bisect import bisect_left
+import os
+import threading
+import time
+
+# Latency bucket upper bounds in seconds, 250us to 10s
+LATENCY_BUCKETS = (
+    0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+# Time spent in each stage of one request. mark(stage) charges everything since the
+# previous mark (or the start) to stage; a stage marked twice accumulates.
+class StageTimer:
+    __slots__ = ("started", "stages", "_last")
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.stages = {}
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last)
+        self._last = now
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        # Server-Timing header value; durations are in milliseconds
+        parts = [f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in self.stages.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.3f}")
+        return ", ".join(parts)
+
+
+# Cumulative Prometheus-style histogram
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+def _labels(labels):
+    return ",".join(f'{name}="{value}"' for name, value in labels)
+
+
+# Histograms keyed by metric name and label values, rendered in the Prometheus text format
+class Metrics:
+    def __init__(self):
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def observe(self, name, labels, value):
+        # labels is a tuple of (label, value) pairs
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def render_histograms(self):
+        lines = []
+        with self._lock:
+            items = sorted(self._histograms.items())
+            snapshots = [(key, list(h.counts), h.count, h.sum, h.buckets) for key, h in items]
+        current = None
+        for (name, labels), counts, count, total, buckets in snapshots:
+            if name != current:
+                current = name
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+            prefix = _labels(labels) + "," if labels else ""
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {count}')
+            label_text = "{" + _labels(labels) + "}" if labels else ""
+            lines.append(f"{name}_sum{label_text} {total}")
+            lines.append(f"{name}_count{label_text} {count}")
+        return lines
+
+
+def render_gauges(name, kind, text, samples):
+    # samples: iterable of (labels, value); values of None are skipped
+    lines = [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        if value is None:
+            continue
+        label_text = "{" + _labels(labels) + "}" if labels else ""
+        lines.append(f"{name}{label_text} {value}")
+    return lines
+
+
+def process_memory():
+    # Resident set size in bytes where the platform exposes it (Linux /proc), else None
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
@@ -0,0 +1,61 @@
+import numpy as np
+
+# Store columns with a sorted index, so searches can filter on them by range and
+# order results by them without sorting
+NUMERIC_FIELDS = ("minutes", "n_steps", "n_ingredients")
+
+
+# Every recipe ID ordered by one numeric column (ties by recipe ID), with the column's
+# values in that order and each recipe's position in it. A range of values is a
+# contiguous slice of the order, found by binary search.
+class NumericIndex:
+    def __init__(self, order, values, ranks):
+        self.order = order    # recipe IDs, ascending by value
+        self.values = values  # the column's values in that order
+        self.ranks = ranks    # recipe ID -> its position in order
+
+    @classmethod
+    def from_values(cls, column):
+        order = np.argsort(column, kind="stable").astype(np.int32)
+        return cls(order, column[order], _ranks(order))
+
+    def extended(self, column, start):
+        # Index of column, given that this one covers its rows before start. The new rows
+        # have the largest IDs, so each goes after every old row with the same value and
+        # the two sorted runs merge without re-sorting the old one.
+        delta = np.argsort(column[start:], kind="stable").astype(np.int32) + np.int32(start)
+        delta_values = column[delta]
+        positions = np.searchsorted(self.values, delta_values, side="right")
+        order = np.insert(self.order, positions, delta)
+        values = np.insert(self.values, positions, delta_values)
+        return NumericIndex(order, values, _ranks(order))
+
+    def between(self, low=None, high=None):
+        # IDs of the recipes whose value is in [low, high], ascending by value; None is unbounded
+        start = 0 if low is None else np.searchsorted(self.values, low, side="left")
+        end = len(self.values) if high is None else np.searchsorted(self.values, high, side="right")
+        return self.order[start:max(start, end)]
+
+    def order_of(self, recipe_ids):
+        # Positions in recipe_ids (distinct IDs) of its recipes, ascending by value
+        if len(recipe_ids) * 16 < len(self.order):
+            # Few recipes: ranks are distinct, so sorting them gives the index's order
+            return np.argsort(self.ranks[recipe_ids])
+        # Many: walk the pre-ordered IDs once and keep the ones in recipe_ids
+        positions = np.full(len(self.order), -1, dtype=np.int64)
+        positions[recipe_ids] = np.arange(len(recipe_ids))
+        walked = positions[self.order]
+        return walked[walked >= 0]
+
+    def __len__(self):
+        return len(self.order)
+
+    @property
+    def nbytes(self):
+        return self.order.nbytes + self.values.nbytes + self.ranks.nbytes
+
+
+def _ranks(order):
+    ranks = np.empty(len(order), dtype=np.int32)
+    ranks[order] = np.arange(len(order), dtype=np.int32)
+    return ranks
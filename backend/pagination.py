@@ -0,0 +1,63 @@
+import base64
+import binascii
+import json
+
+from search import OPTIONAL_FIELDS, RANGE_FILTERS
+from store import PREDEFINED_TAGS
+
+DATA_STRUCTURES = ('trie', 'hashmap')
+
+
+# Cursors are opaque to clients but carry the whole query, so a page can be served
+# (re-ranking if needed) by whichever process gets the request. The index generation
+# makes a cursor from before a rebuild detectable instead of silently skipping results.
+def encode_cursor(generation, user_ingredients, user_tags, sort_by, data_structure, ranges, fields, offset):
+    payload = {
+        "g": generation,
+        "i": sorted(user_ingredients),
+        "t": sorted(user_tags),
+        "s": sort_by,
+        "d": data_structure,
+        "r": dict(ranges),
+        "f": list(fields),
+        "o": offset,
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    # Returns (generation, ingredients, tags, sort_by, data_structure, ranges, fields, offset);
+    # raises ValueError for anything that is not a cursor this server handed out
+    if not isinstance(cursor, str):
+        raise ValueError("cursor must be a string")
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError("malformed cursor") from e
+    if not isinstance(payload, dict):
+        raise ValueError("malformed cursor")
+
+    generation, offset = payload.get("g"), payload.get("o")
+    ingredients, tags = payload.get("i"), payload.get("t")
+    sort_by, data_structure = payload.get("s"), payload.get("d")
+    ranges, fields = payload.get("r", {}), payload.get("f", [])
+    if type(generation) is not int or type(offset) is not int or offset < 0:
+        raise ValueError("malformed cursor")
+    if not isinstance(ingredients, list) or not all(isinstance(ing, str) for ing in ingredients):
+        raise ValueError("malformed cursor")
+    if not isinstance(tags, list) or not all(isinstance(tag, str) and tag in PREDEFINED_TAGS for tag in tags):
+        raise ValueError("malformed cursor")
+    if not isinstance(sort_by, str) or data_structure not in DATA_STRUCTURES:
+        raise ValueError("malformed cursor")
+    if not isinstance(ranges, dict) or not all(
+        key in RANGE_FILTERS and type(value) is int and value >= 0 for key, value in ranges.items()
+    ):
+        raise ValueError("malformed cursor")
+    if not isinstance(fields, list) or not all(isinstance(field, str) and field in OPTIONAL_FIELDS for field in fields):
+        raise ValueError("malformed cursor")
+    if not ingredients and not tags:
+        raise ValueError("malformed cursor")
+    ranges, fields = tuple(sorted(ranges.items())), tuple(sorted(set(fields)))
+    return generation, set(ingredients), set(tags), sort_by, data_structure, ranges, fields, offset
@@ -0,0 +1,263 @@
+import gc
+import os
+import select
+import signal
+import socket
+import threading
+import time
+import traceback
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+WORKER_STOP_TIMEOUT = 30
+# How long a stopping worker waits for its requests to finish; shorter than
+# WORKER_STOP_TIMEOUT so it exits before the master kills it
+WORKER_DRAIN_TIMEOUT = 25
+# A worker that exits sooner than this after being forked is replaced with a delay that
+# doubles on every such exit, up to the maximum, so one that fails at startup does not
+# make the master fork in a tight loop
+WORKER_MIN_LIFETIME = 5
+WORKER_RESTART_DELAY = 0.5
+WORKER_MAX_RESTART_DELAY = 30
+
+
+# Pre-fork HTTP server: the master process binds the listening socket and forks worker
+# processes that accept connections on it, so one copy of everything the app built
+# before serve_forever() (the recipe indexes) is shared by every worker through
+# copy-on-write pages. gc.freeze() before each fork moves those objects out of the
+# collector's reach; otherwise the first collection in every worker would write to
+# each object's GC header and turn the shared pages into private copies.
+#
+# The master only supervises: it replaces workers that die, forwards SIGHUP to
+# on_hup, and when generation() changes (e.g. the indexes were rebuilt) it forks a
+# fresh set of workers from the new state and gracefully stops the old ones.
+class PreforkServer:
+    def __init__(self, app, host, port, workers, generation=None, post_fork=None, on_hup=None,
+                 poll_interval=0.5):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.worker_count = max(1, workers)
+        self.generation = generation
+        self.post_fork = post_fork  # runs in each worker right after the fork
+        self.on_hup = on_hup  # runs in the master on SIGHUP
+        self.poll_interval = poll_interval
+        self.master_pid = os.getpid()
+        self.workers = {}  # pid -> generation it was forked from
+        self._started = {}  # pid -> when it was forked
+        self._restart_delay = 0
+        self._restart_at = None  # when to replace workers that exited early
+        self.socket = None
+        self._current = None
+        self._stopping = False
+        self._hup = False
+
+    def serve_forever(self):
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        self.socket = socket.create_server((self.host, self.port), family=family, backlog=1024)
+        self.port = self.socket.getsockname()[1]
+        # Every worker polls this socket and accept()s when it is readable, but only one
+        # of them gets each connection; the others must not block in accept() until the
+        # next one arrives, or they could not stop until then
+        self.socket.setblocking(False)
+        previous = {
+            signum: signal.signal(signum, handler)
+            for signum, handler in (
+                (signal.SIGTERM, self._handle_stop),
+                (signal.SIGINT, self._handle_stop),
+                (signal.SIGHUP, self._handle_hup),
+            )
+        }
+        try:
+            self._current = self._generation()
+            self._spawn_workers()
+            while not self._stopping:
+                self._reap()
+                if self._restart_at is not None and time.monotonic() >= self._restart_at:
+                    self._restart_at = None
+                    self._spawn_workers()
+                if self._hup:
+                    self._hup = False
+                    if self.on_hup is not None:
+                        self.on_hup()
+                generation = self._generation()
+                if generation != self._current:
+                    self._current = generation
+                    self._roll_workers()
+                time.sleep(self.poll_interval)
+        finally:
+            self._stop_workers(list(self.workers))
+            self.socket.close()
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+    def notify_master(self):
+        # Called from a worker: ask the master to run on_hup
+        os.kill(self.master_pid, signal.SIGHUP)
+
+    def _generation(self):
+        return self.generation() if self.generation is not None else None
+
+    def _handle_stop(self, signum, frame):
+        self._stopping = True
+
+    def _handle_hup(self, signum, frame):
+        self._hup = True
+
+    def _spawn_workers(self):
+        # Objects freed since the last fork can be collected again, then everything
+        # still alive is frozen into the permanent generation the children inherit
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+        while sum(1 for generation in self.workers.values() if generation == self._current) < self.worker_count:
+            self._spawn()
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                self._run_worker()
+            except BaseException:
+                traceback.print_exc()
+                status = 1
+            finally:
+                # Never return into the master's code path
+                os._exit(status)
+        self.workers[pid] = self._current
+        self._started[pid] = time.monotonic()
+
+    def _roll_workers(self):
+        old = [pid for pid, generation in self.workers.items() if generation != self._current]
+        self._spawn_workers()
+        print(f"Started {self.worker_count} workers for generation {self._current}; stopping {len(old)} old workers")
+        for pid in old:
+            self._signal(pid, signal.SIGTERM)
+
+    def _reap(self):
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            generation = self.workers.pop(pid, None)
+            lifetime = time.monotonic() - self._started.pop(pid, 0)
+            if generation != self._current or self._stopping:
+                continue
+            if lifetime >= WORKER_MIN_LIFETIME:
+                self._restart_delay = 0
+                print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; replacing it")
+                self._spawn_workers()
+                continue
+            self._restart_delay = min(max(2 * self._restart_delay, WORKER_RESTART_DELAY), WORKER_MAX_RESTART_DELAY)
+            if self._restart_at is None:
+                self._restart_at = time.monotonic() + self._restart_delay
+            print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)} after {lifetime:.1f}s;"
+                  f" replacing it in {self._restart_delay:.1f}s")
+
+    def _stop_workers(self, pids):
+        for pid in pids:
+            self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + WORKER_STOP_TIMEOUT
+        while pids and time.monotonic() < deadline:
+            pids = [pid for pid in pids if not self._exited(pid)]
+            if pids:
+                time.sleep(0.05)
+        for pid in pids:
+            self._signal(pid, signal.SIGKILL)
+            self._exited(pid, block=True)
+        self.workers.clear()
+        self._started.clear()
+
+    def _exited(self, pid, block=False):
+        try:
+            return os.waitpid(pid, 0 if block else os.WNOHANG)[0] == pid
+        except ChildProcessError:
+            return True
+
+    def _signal(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _run_worker(self):
+        # Ctrl+C reaches the whole process group; the master decides when workers stop
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        if self.post_fork is not None:
+            self.post_fork()
+        server = make_server(self.host, self.port, self.app, threaded=True, fd=self.socket.fileno(),
+                             request_handler=_DrainingRequestHandler)
+        server.connections = set()
+        server.connections_lock = threading.Lock()
+        server.draining = False
+
+        def stop(*args):
+            # shutdown() waits for serve_forever() to return, so it can't run on this thread
+            if not server.draining:
+                server.draining = True
+                threading.Thread(target=server.shutdown, daemon=True).start()
+
+        def check_master():
+            # Exit with an orphaned worker rather than serving without supervision
+            if os.getppid() != self.master_pid:
+                stop()
+
+        signal.signal(signal.SIGTERM, stop)
+        server.service_actions = check_master
+        server.serve_forever()
+        server.server_close()
+        _drain(server)
+
+
+def _drain(server):
+    # After the worker stops accepting: wait for its requests in flight to finish, and
+    # close the idle keep-alive connections so their clients reconnect to another worker
+    deadline = time.monotonic() + WORKER_DRAIN_TIMEOUT
+    while time.monotonic() < deadline:
+        with server.connections_lock:
+            handlers = list(server.connections)
+        if not handlers:
+            return
+        for handler in handlers:
+            # A connection with unread bytes already carries its next request
+            if handler.idle and not select.select([handler.connection], [], [], 0)[0]:
+                try:
+                    # Its thread's read returns end-of-file and it closes the connection
+                    handler.connection.shutdown(socket.SHUT_RD)
+                except OSError:
+                    pass
+        time.sleep(0.05)
+    print(f"Worker {os.getpid()} exiting with {len(handlers)} connections still open")
+
+
+# Tracks a worker's open connections so that when it stops it can wait for the
+# requests in flight and close keep-alive connections that are waiting for their next
+# request. werkzeug serves each connection on a daemon thread, which nothing joins
+# before the process exits.
+class _DrainingRequestHandler(WSGIRequestHandler):
+    def setup(self):
+        super().setup()
+        self.idle = False  # served a request and waiting for the next one
+        with self.server.connections_lock:
+            self.server.connections.add(self)
+
+    def parse_request(self):
+        self.idle = False
+        return super().parse_request()
+
+    def handle_one_request(self):
+        super().handle_one_request()
+        if self.server.draining:
+            # The client reconnects, to a worker that is not stopping
+            self.close_connection = True
+        self.idle = True
+
+    def finish(self):
+        with self.server.connections_lock:
+            self.server.connections.discard(self)
+        super().finish()
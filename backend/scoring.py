@@ -0,0 +1,106 @@
+import numpy as np
+
+
+# One query's match counts and matched rarity: dense over every recipe, or sparse over
+# the sorted recipe IDs it touches (recipes absent from a sparse row scored zero)
+class QueryScores:
+    def __init__(self, counts, weights, recipe_ids=None):
+        self.counts = counts
+        self.weights = weights
+        self.recipe_ids = recipe_ids
+
+    def at(self, recipe_ids):
+        if self.recipe_ids is None:
+            return self.counts[recipe_ids], self.weights[recipe_ids]
+        counts = np.zeros(len(recipe_ids), dtype=np.int64)
+        weights = np.zeros(len(recipe_ids))
+        if len(self.recipe_ids):
+            positions = np.minimum(np.searchsorted(self.recipe_ids, recipe_ids), len(self.recipe_ids) - 1)
+            found = self.recipe_ids[positions] == recipe_ids
+            counts[found] = self.counts[positions[found]]
+            weights[found] = self.weights[positions[found]]
+        return counts, weights
+
+
+# Sparse recipe-by-ingredient incidence matrix A (one row per recipe, one column per
+# canonical ingredient term) used to score queries for every recipe at once. A is kept in
+# its transposed CSR form, which is exactly the inverted index's posting lists, so
+# A @ q for a 0/1 query vector q costs one pass over the query's columns rather than
+# over every recipe.
+class ScoringMatrix:
+    def __init__(self, lexicon, offsets, recipe_ids, term_counts, n_recipes):
+        self.lexicon = lexicon
+        self.offsets = offsets
+        self.recipe_ids = recipe_ids
+        self.n_recipes = n_recipes
+        # Row sums of A: distinct terms per recipe
+        self.term_counts = term_counts
+
+        # Rarity of each ingredient as its inverse document frequency, and each
+        # recipe's total rarity (A @ idf) to subtract matched rarity from
+        document_frequency = np.diff(self.offsets)
+        self.idf = np.log(n_recipes / np.maximum(document_frequency, 1))
+        self.recipe_weights = np.bincount(
+            self.recipe_ids, weights=np.repeat(self.idf, document_frequency), minlength=n_recipes
+        )
+
+    @classmethod
+    def from_index(cls, index, n_recipes):
+        # Shares the index's arrays; nothing is copied
+        return cls(index.lexicon, index.offsets, index.recipe_ids, index.term_counts, n_recipes)
+
+    def term_ids(self, ingredients):
+        # Column indices of a query's nonzero entries; unknown ingredients match nothing
+        ids = {self.lexicon.term_id(ing) for ing in ingredients}
+        ids.discard(None)
+        return np.array(sorted(ids), dtype=np.int64)
+
+    def _columns(self, term_ids):
+        # Row indices of A's nonzeros in the given columns, concatenated, plus their column
+        starts, ends = self.offsets[term_ids], self.offsets[term_ids + 1]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        # Position of each nonzero inside recipe_ids: its column's start plus its rank within it
+        shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        positions = np.arange(total, dtype=np.int64) + shifts
+        return self.recipe_ids[positions], np.repeat(term_ids, lengths)
+
+    def match_counts(self, ingredients):
+        # A @ q: number of query ingredients in every recipe, and their summed rarity
+        rows, columns = self._columns(self.term_ids(ingredients))
+        counts = np.bincount(rows, minlength=self.n_recipes)
+        weights = np.bincount(rows, weights=self.idf[columns], minlength=self.n_recipes)
+        return QueryScores(counts, weights)
+
+    def match_counts_batch(self, queries):
+        # A @ Q for a batch of queries (ingredient collections), as one sparse-sparse
+        # product; only recipes sharing an ingredient with a query appear in its scores
+        term_ids = [self.term_ids(ingredients) for ingredients in queries]
+        lengths = np.array([len(ids) for ids in term_ids], dtype=np.int64)
+        query_of_term = np.repeat(np.arange(len(queries), dtype=np.int64), lengths)
+        all_terms = np.concatenate(term_ids) if term_ids else np.zeros(0, dtype=np.int64)
+
+        rows, columns = self._columns(all_terms)
+        query_of_entry = np.repeat(query_of_term, np.diff(self.offsets)[all_terms])
+        keys, inverse, counts = np.unique(
+            query_of_entry * self.n_recipes + rows, return_inverse=True, return_counts=True
+        )
+        weights = np.bincount(inverse, weights=self.idf[columns], minlength=len(keys))
+
+        offsets = np.zeros(len(queries) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // self.n_recipes, minlength=len(queries)), out=offsets[1:])
+        recipe_ids = keys % self.n_recipes
+        return [
+            QueryScores(counts[start:end], weights[start:end], recipe_ids[start:end])
+            for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+        ]
+
+    def coverage(self, counts, recipe_ids):
+        # Share of each recipe's ingredients the query covers
+        totals = self.term_counts[recipe_ids]
+        return np.divide(counts, totals, out=np.zeros(len(recipe_ids)), where=totals > 0)
+
+    def missing_weight(self, weights, recipe_ids):
+        # Summed rarity of the ingredients each recipe still needs; missing a rare
+        # ingredient costs more than missing a staple
+        return self.recipe_weights[recipe_ids] - weights
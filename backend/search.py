@@ -0,0 +1,303 @@
+import heapq
+from itertools import islice, repeat
+import sys
+import threading
+
+import numpy as np
+
+from inverted_index import merge_postings
+from store import TAG_BITS, tag_mask
+
+# Sort modes ranked with the scoring matrix: highest share of the recipe's ingredients
+# covered, and fewest missing ingredients weighted by how rare they are
+SCORED_SORTS = ("coverage", "rarity")
+# Results are summaries (ID, name, minutes, step count, matched and missing ingredients,
+# matched tags); a request can list any of these fields to add them. The text fields are
+# cold: they are read from the recipe's detail body, so they cost a lookup per result.
+OPTIONAL_FIELDS = ("description", "instructions", "ingredients", "tags", "n_ingredients")
+COLD_FIELDS = ("description", "instructions")
+# Range filters a request can set: request key -> (NumericIndex column, bound). Bounds
+# are inclusive, and the recipes outside them are dropped before ingredient matching.
+RANGE_FILTERS = {
+    "min_minutes": ("minutes", "min"),
+    "max_minutes": ("minutes", "max"),
+    "min_steps": ("n_steps", "min"),
+    "max_steps": ("n_steps", "max"),
+    "min_ingredients": ("n_ingredients", "min"),
+    "max_ingredients": ("n_ingredients", "max"),
+}
+# Sort modes that follow a NumericIndex's order: sort mode -> column
+NUMERIC_SORTS = {"total_time": "minutes", "num_steps": "n_steps"}
+
+
+# Trie walks and posting lists fetched for a set of queries, by term ID. A batch shares
+# one instance, so an ingredient that appears in many of its queries is only looked up once.
+class IndexLookups:
+    def __init__(self, indexes):
+        self.indexes = indexes
+        self._trie = {}
+        self._postings = {}
+        self._scores = {}
+        self._allowed = {}
+
+    def allowed(self, ranges):
+        allowed = self._allowed.get(ranges)
+        if allowed is None and ranges:
+            allowed = self._allowed[ranges] = allowed_recipes(self.indexes, ranges)
+        return allowed
+
+    def trie(self, term_id):
+        recipe_ids = self._trie.get(term_id)
+        if recipe_ids is None:
+            term = self.indexes.store.lexicon.terms[term_id]
+            recipe_ids = self._trie[term_id] = self.indexes.trie.search(term)
+        return recipe_ids
+
+    def postings(self, term_id):
+        recipe_ids = self._postings.get(term_id)
+        if recipe_ids is None:
+            recipe_ids = self._postings[term_id] = self.indexes.ingredient_index.postings(term_id).tolist()
+        return recipe_ids
+
+    def scores(self, user_ingredients):
+        key = frozenset(user_ingredients)
+        scores = self._scores.get(key)
+        if scores is None:
+            scores = self._scores[key] = self.indexes.scoring.match_counts(key)
+        return scores
+
+    def prefetch_scores(self, queries):
+        # Score every not yet scored ingredient set in one matrix-matrix product
+        keys = list({frozenset(ingredients) for ingredients in queries} - self._scores.keys())
+        if keys:
+            self._scores.update(zip(keys, self.indexes.scoring.match_counts_batch(keys)))
+
+
+def query_terms(lexicon, user_ingredients):
+    # The query in the ingredient ID space: ingredient -> term ID. Ingredients no recipe
+    # uses are dropped, and of several naming one term only the first (sorted) is kept.
+    terms, seen = {}, set()
+    for ingredient in sorted(user_ingredients):
+        term_id = lexicon.term_id(ingredient)
+        if term_id is not None and term_id not in seen:
+            seen.add(term_id)
+            terms[ingredient] = term_id
+    return terms
+
+
+def allowed_recipes(indexes, ranges):
+    # Boolean mask over recipe IDs of the recipes inside every range in ranges, a tuple of
+    # (RANGE_FILTERS key, value) pairs. Only the narrowest column's range is read from its
+    # index; the other bounds are checked on the recipes in it.
+    bounds = {}
+    for key, value in ranges:
+        column, bound = RANGE_FILTERS[key]
+        low, high = bounds.get(column, (None, None))
+        bounds[column] = (value, high) if bound == "min" else (low, value)
+    slices = {column: indexes.numeric_indexes[column].between(low, high) for column, (low, high) in bounds.items()}
+    narrowest = min(slices, key=lambda column: len(slices[column]))
+    recipe_ids = slices[narrowest]
+    for column, (low, high) in bounds.items():
+        if column != narrowest:
+            values = getattr(indexes.store, column)[recipe_ids]
+            keep = np.ones(len(recipe_ids), dtype=bool)
+            if low is not None:
+                keep &= values >= low
+            if high is not None:
+                keep &= values <= high
+            recipe_ids = recipe_ids[keep]
+    allowed = np.zeros(len(indexes.store), dtype=bool)
+    allowed[recipe_ids] = True
+    return allowed
+
+
+def narrowed(recipe_ids, allowed):
+    # The allowed recipes of a sorted ID sequence, as a list
+    recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+    return recipe_ids[allowed[recipe_ids]].tolist()
+
+
+# Trie path: each term's recipes are stored under its canonical name; the lists are merged
+# in recipe ID order like the inverted index's, so both paths find the same candidates
+def trie_candidates(lookups, terms, allowed=None):
+    lists = []
+    for ingredient, term_id in terms.items():
+        recipe_ids = lookups.trie(term_id)
+        if allowed is not None:
+            recipe_ids = narrowed(recipe_ids, allowed)
+        lists.append(zip(recipe_ids, repeat(ingredient)))
+    return [(recipe_id, set(matched)) for recipe_id, matched in merge_postings(lists)]
+
+
+# HashMap path: merge the inverted index's posting lists and resolve each ID through the map
+def hashmap_candidates(lookups, terms, allowed=None):
+    indexes = lookups.indexes
+    postings = lookups.postings
+    if allowed is not None:
+        postings = lambda term_id: narrowed(indexes.ingredient_index.postings(term_id), allowed)
+    candidates = []
+    for recipe_id, matched in indexes.ingredient_index.match(terms, postings):
+        row = indexes.recipe_map.get(recipe_id)
+        if row is not None:
+            candidates.append((row, set(matched)))
+    return candidates
+
+
+# Tag-only queries: every recipe carrying at least one of the tags, via the tag bitmasks
+def tag_candidates(store, user_tags, allowed=None):
+    matches = (store.tag_masks & tag_mask(user_tags)) != 0
+    if allowed is not None:
+        matches &= allowed
+    recipe_ids = np.flatnonzero(matches)
+    return [(recipe_id, set()) for recipe_id in recipe_ids.tolist()]
+
+
+def filter_candidates(store, candidates, user_tags):
+    # Drop recipes with no total time and, when tags were requested, those matching
+    # none of them; both checks are vectorized over the candidate set
+    if not candidates:
+        return candidates
+    recipe_ids = np.fromiter((recipe_id for recipe_id, _ in candidates), dtype=np.int64, count=len(candidates))
+    keep = store.minutes[recipe_ids] != 0
+    if user_tags:
+        keep &= (store.tag_masks[recipe_ids] & tag_mask(user_tags)) != 0
+    return [candidate for candidate, kept in zip(candidates, keep.tolist()) if kept]
+
+
+def missing_counts(indexes, candidates, recipe_ids):
+    # Terms of each recipe the query lacks; a query holds at most one ingredient per term
+    matched_counts = np.fromiter((len(matched) for _, matched in candidates), dtype=np.int64, count=len(candidates))
+    return (indexes.ingredient_index.term_counts[recipe_ids] - matched_counts).tolist()
+
+
+def sort_keys(lookups, candidates, user_ingredients, sort_by):
+    # Sort keys are computed for every candidate, but only as plain numbers
+    indexes = lookups.indexes
+    recipe_ids = np.fromiter((recipe_id for recipe_id, _ in candidates), dtype=np.int64, count=len(candidates))
+    if sort_by == "matched_ingredients":
+        return [-len(matched) for _, matched in candidates]
+    if sort_by == "missing_ingredients":
+        return missing_counts(indexes, candidates, recipe_ids)
+    if sort_by in SCORED_SORTS:
+        # Scored against the same terms on both paths, see ScoringMatrix
+        counts, weights = lookups.scores(user_ingredients).at(recipe_ids)
+        if sort_by == "coverage":
+            return (-indexes.scoring.coverage(counts, recipe_ids)).tolist()
+        return indexes.scoring.missing_weight(weights, recipe_ids).tolist()
+    return None
+
+
+def select_top(keys, count, limit):
+    # heapq.nsmallest keeps ties in input order, so this equals sorted(...)[:limit]
+    # without sorting everything past the cut
+    if keys is None:
+        return list(islice(range(count), limit))
+    return heapq.nsmallest(limit, range(count), key=keys.__getitem__)
+
+
+def materialize(indexes, recipe_id, matched, user_terms, user_tags, fields=()):
+    store = indexes.store
+    # The recipe's own spelling of each term it needs that the query lacks
+    missing_ingredients, seen = [], set(user_terms)
+    vocab_ids, term_ids = store.ingredient_ids_of(recipe_id).tolist(), store.term_ids_of(recipe_id).tolist()
+    for vocab_id, term_id in zip(vocab_ids, term_ids):
+        if term_id not in seen:
+            seen.add(term_id)
+            missing_ingredients.append(store.ingredient_vocab[vocab_id])
+    matched_mask = int(store.tag_masks[recipe_id]) & tag_mask(user_tags)
+    result = {
+        "id": recipe_id,
+        "name": store.name(recipe_id),
+        "minutes": int(store.minutes[recipe_id]),
+        "matched_ingredients": list(matched),
+        "missing_ingredients": missing_ingredients,
+        "n_steps": int(store.n_steps[recipe_id]),
+        "matched_tags": [tag for tag in user_tags if matched_mask & TAG_BITS[tag]],
+    }
+    if any(field in COLD_FIELDS for field in fields):
+        detail = indexes.details.detail(recipe_id)
+        if "description" in fields:
+            result["description"] = detail["description"]
+        if "instructions" in fields:
+            result["instructions"] = detail["steps"]
+    if "ingredients" in fields:
+        result["ingredients"] = store.ingredients(recipe_id)
+    if "tags" in fields:
+        result["tags"] = store.tags(recipe_id)
+    if "n_ingredients" in fields:
+        result["n_ingredients"] = int(store.n_ingredients[recipe_id])
+    return result
+
+
+# Every match of one query with its sort keys. Only as much of the ranking as the pages
+# requested so far is worked out: the first page is a top-K selection, and the first
+# page past it sorts the whole match set once so later pages are plain slices. Sorts
+# by a NumericIndex column pass the finished order instead of keys.
+class Ranking:
+    def __init__(self, candidates, keys, user_terms, user_tags, order=None):
+        self.candidates = candidates
+        self.keys = keys
+        self.user_terms = user_terms
+        self.user_tags = user_tags
+        # Candidate indices, best first; a prefix until fully sorted
+        self._order = order if order is not None else []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def window(self, offset, limit):
+        end = min(offset + limit, len(self.candidates))
+        with self._lock:
+            if len(self._order) < end:
+                count = end if not self._order else len(self.candidates)
+                self._order = select_top(self.keys, len(self.candidates), count)
+            order = self._order
+        return [self.candidates[i] for i in order[offset:end]]
+
+    def page(self, indexes, offset, limit, fields=(), timer=None):
+        window = self.window(offset, limit)
+        if timer is not None:
+            timer.mark("sort")
+        results = [
+            materialize(indexes, recipe_id, matched, self.user_terms, self.user_tags, fields)
+            for recipe_id, matched in window
+        ]
+        if timer is not None:
+            timer.mark("materialize")
+        return results
+
+    @property
+    def approx_bytes(self):
+        # Candidate tuples, their matched sets and the key and order lists
+        return sys.getsizeof(self.candidates) + len(self.candidates) * 300
+
+
+def rank(indexes, user_ingredients, user_tags, sort_by, data_structure, lookups=None, timer=None, ranges=()):
+    # Collect light (recipe_id, matched ingredients) records and their sort keys;
+    # full result dicts are only built for the pages that are served
+    if lookups is None:
+        lookups = IndexLookups(indexes)
+    # One dictionary lookup per ingredient; everything after matches on term IDs
+    terms = query_terms(indexes.store.lexicon, user_ingredients)
+    allowed = lookups.allowed(ranges)
+    if not user_ingredients:
+        candidates = tag_candidates(indexes.store, user_tags, allowed)
+    elif data_structure == 'trie':
+        candidates = trie_candidates(lookups, terms, allowed)
+    else:
+        candidates = hashmap_candidates(lookups, terms, allowed)
+    candidates = filter_candidates(indexes.store, candidates, user_tags)
+    if timer is not None:
+        timer.mark("match")
+    keys = order = None
+    if sort_by in NUMERIC_SORTS:
+        # The column's index is already in order, so the candidates are merged into it
+        # rather than sorted; ties go to the lower recipe ID
+        recipe_ids = np.fromiter((recipe_id for recipe_id, _ in candidates), dtype=np.int64, count=len(candidates))
+        order = indexes.numeric_indexes[NUMERIC_SORTS[sort_by]].order_of(recipe_ids).tolist()
+    else:
+        keys = sort_keys(lookups, candidates, user_ingredients, sort_by)
+    if timer is not None:
+        timer.mark("score")
+    return Ranking(candidates, keys, frozenset(terms.values()), user_tags, order)
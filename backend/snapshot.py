@@ -0,0 +1,193 @@
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+
+import numpy as np
+
+# Compiled index snapshot file layout:
+#   MAGIC | header length (uint32, little endian) | JSON header | section bytes...
+# The header records where each named section lives and a fingerprint of the
+# CSV it was compiled from, so a stale snapshot is never served.
+MAGIC = b"GBSNAP\x00\x01"
+FORMAT_VERSION = 7
+_HEADER_LEN = struct.Struct("<I")
+# Sections start on 8-byte boundaries so numeric arrays can be viewed in place
+ALIGNMENT = 8
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def file_sha256(path, chunk_size=1 << 20, size=None):
+    # Hash of the file's first size bytes (all of it by default)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        remaining = os.fstat(f.fileno()).st_size if size is None else size
+        while remaining:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def complete_size(path, chunk_size=1 << 16):
+    # Offset just past the file's last newline: a row still being appended after it
+    # is left out until it is complete
+    with open(path, "rb") as f:
+        end = os.fstat(f.fileno()).st_size
+        while end:
+            start = max(0, end - chunk_size)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                return start + newline + 1
+            end = start
+    return 0
+
+
+def source_fingerprint(path):
+    # Describes the CSV up to its last complete row, which is all a build reads
+    stat = os.stat(path)
+    size = complete_size(path)
+    return {
+        "size": size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": file_sha256(path, size=size),
+    }
+
+
+def fingerprint_matches(fingerprint, path):
+    # Size and mtime are checked first; the file is only hashed when the size
+    # matches but the mtime moved (e.g. the CSV was copied or touched)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if stat.st_size != fingerprint.get("size"):
+        return False
+    if stat.st_mtime_ns == fingerprint.get("mtime_ns"):
+        return True
+    return file_sha256(path) == fingerprint.get("sha256")
+
+
+def classify_source(fingerprint, path, chunk_size=1 << 20):
+    # How the CSV at path relates to the content fingerprint describes:
+    #   ("unchanged", fingerprint): same content, or only part of a row appended so far
+    #   ("appended", new_fingerprint): whole rows were added after the fingerprinted
+    #       bytes; new_fingerprint covers everything up to the last complete row
+    #   ("replaced", None): anything else, which needs a full rebuild
+    stat = os.stat(path)
+    size = fingerprint["size"]
+    if stat.st_size == size:
+        if fingerprint_matches(fingerprint, path):
+            return "unchanged", fingerprint
+        return "replaced", None
+    if stat.st_size < size or size == 0:
+        return "replaced", None
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        remaining, last = size, b""
+        while remaining:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                return "replaced", None
+            digest.update(chunk)
+            remaining -= len(chunk)
+            last = chunk
+        # Rows can only be appended after a complete final row
+        if digest.hexdigest() != fingerprint["sha256"] or not last.endswith(b"\n"):
+            return "replaced", None
+        tail = f.read(stat.st_size - size)
+
+    end = tail.rfind(b"\n") + 1
+    if end == 0:
+        return "unchanged", fingerprint
+    digest.update(tail[:end])
+    return "appended", {"size": size + end, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+
+
+def write_snapshot(path, fingerprint, sections):
+    # sections maps a name to raw bytes; objects are pickled by the caller
+    header = {"version": FORMAT_VERSION, "source": fingerprint, "sections": {}}
+    offset = 0
+    for name, payload in sections.items():
+        header["sections"][name] = [offset, len(payload)]
+        offset = _aligned(offset + len(payload))
+    header_bytes = json.dumps(header).encode("utf-8")
+    header_end = len(MAGIC) + _HEADER_LEN.size + len(header_bytes)
+
+    # Write to a temporary file and rename so readers never see a partial snapshot
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LEN.pack(len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (_aligned(header_end) - header_end))
+        for payload in sections.values():
+            f.write(payload)
+            f.write(b"\0" * (_aligned(len(payload)) - len(payload)))
+    os.replace(tmp_path, path)
+
+
+# A memory-mapped snapshot file; sections are read straight from the mapping
+class Snapshot:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a recipe index snapshot")
+        start = len(MAGIC)
+        (header_len,) = _HEADER_LEN.unpack_from(self._mm, start)
+        start += _HEADER_LEN.size
+        self.header = json.loads(self._mm[start:start + header_len])
+        self._data_start = _aligned(start + header_len)
+        if self.header.get("version") != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{path} has unsupported snapshot version {self.header.get('version')}")
+
+    @property
+    def source(self):
+        return self.header["source"]
+
+    def section(self, name):
+        offset, length = self.header["sections"][name]
+        start = self._data_start + offset
+        return memoryview(self._mm)[start:start + length]
+
+    def array(self, name, dtype):
+        # Zero-copy NumPy view of a section
+        return np.frombuffer(self.section(name), dtype=dtype)
+
+    def load(self, name):
+        view = self.section(name)
+        try:
+            return pickle.loads(view)
+        finally:
+            view.release()
+
+    def close(self):
+        self._mm.close()
+
+
+def open_snapshot(path, data_file):
+    # Returns None when the snapshot is missing, unreadable or stale for data_file
+    if not os.path.exists(path):
+        return None
+    try:
+        snapshot = Snapshot(path)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring snapshot {path}: {e}")
+        return None
+    if not fingerprint_matches(snapshot.source, data_file):
+        snapshot.close()
+        return None
+    return snapshot
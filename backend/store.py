@@ -0,0 +1,303 @@
+import pickle
+
+import numpy as np
+
+from lexicon import IngredientLexicon, canonicalize
+
+PREDEFINED_TAGS = {
+    "vegan", "vegetarian", "gluten-free", "low-carb", "high-protein", "dairy-free",
+    "nut-free", "low-fat", "italian", "mexican", "indian", "chinese", "mediterranean",
+    "american", "thai", "japanese", "breakfast", "lunch", "dinner", "snack", "dessert", 
+    "grilled", "baked", "fried", "roasted", "slow-cooked", "raw", "spicy", "sweet", "savory", 
+    "sour", "salty"
+}
+# The 32 predefined tags fit one uint32 per recipe: tag -> its bit
+TAG_BITS = {tag: 1 << bit for bit, tag in enumerate(sorted(PREDEFINED_TAGS))}
+
+
+def tag_mask(tags):
+    mask = 0
+    for tag in tags:
+        mask |= TAG_BITS.get(tag, 0)
+    return mask
+
+
+def format_title(title):
+    return ' '.join(word.capitalize() for word in title.split())
+
+def format_description(description):
+    if description:
+        return description[0].capitalize() + description[1:] if len(description) > 1 else description.capitalize()
+    return None
+
+def capitalize_steps(steps):
+    return [f"{step.strip().capitalize()}" for i, step in enumerate(steps)]
+
+
+def _to_int(value, default=0):
+    try:
+        return int(value) if value is not None else default
+    except (TypeError, ValueError, OverflowError):
+        return default
+
+
+# Variable-length UTF-8 strings packed into one buffer and addressed by offsets
+class StringColumn:
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, values):
+        encoded = [(value or "").encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(b"".join(encoded), offsets)
+
+    def __getitem__(self, index):
+        return str(self.data[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+    def concat(self, other):
+        # A new column holding this column's strings followed by other's
+        offsets = np.concatenate([self.offsets, other.offsets[1:] + self.offsets[-1]])
+        return StringColumn(bytes(self.data) + bytes(other.data), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        return len(self.data) + self.offsets.nbytes
+
+
+# Interned strings: each distinct value is stored once and referred to by an integer ID
+class Vocabulary:
+    def __init__(self, strings=None):
+        self.strings = list(strings or [])
+        self.ids = {value: i for i, value in enumerate(self.strings)}
+
+    def intern(self, value):
+        vocab_id = self.ids.get(value)
+        if vocab_id is None:
+            vocab_id = len(self.strings)
+            self.ids[value] = vocab_id
+            self.strings.append(value)
+        return vocab_id
+
+    def id_of(self, value):
+        return self.ids.get(value)
+
+    def copy(self):
+        return Vocabulary(self.strings)
+
+    def __getitem__(self, vocab_id):
+        return self.strings[vocab_id]
+
+    def __len__(self):
+        return len(self.strings)
+
+
+def _csr(lists):
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum([len(ids) for ids in lists], out=offsets[1:])
+    ids = np.fromiter((i for row in lists for i in row), dtype=np.int32, count=int(offsets[-1]))
+    return offsets, ids
+
+
+def group_by_value(offsets, values, size):
+    # Invert a CSR row -> values mapping into value -> sorted, distinct rows (also CSR)
+    rows = np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+    order = np.lexsort((rows, values))
+    values, rows = values[order], rows[order]
+    # A row listing the same value twice contributes it only once
+    keep = np.ones(len(rows), dtype=bool)
+    keep[1:] = (rows[1:] != rows[:-1]) | (values[1:] != values[:-1])
+    values, rows = values[keep], rows[keep]
+    grouped_offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(values, minlength=size), out=grouped_offsets[1:])
+    return grouped_offsets, rows
+
+
+# Columnar recipe store. A recipe's ID is its row in every column; ingredient and tag
+# lists are CSR-encoded (offsets + IDs) into interned vocabularies, and every ingredient
+# spelling is mapped to its canonical term (see lexicon.IngredientLexicon). Only the compact
+# fields that searching and ranking read are kept here; the long text fields
+# (description and steps) are cold and live on disk, see details.DetailStore.
+class RecipeStore:
+    ARRAY_FIELDS = {
+        "minutes": np.int64,
+        "n_steps": np.int32,
+        "n_ingredients": np.int32,
+        "ingredient_offsets": np.int64,
+        "ingredient_ids": np.int32,
+        "tag_offsets": np.int64,
+        "tag_ids": np.int32,
+        "tag_masks": np.uint32,
+        "ingredient_terms": np.int32,  # per ingredient vocabulary ID, not per recipe
+    }
+    STRING_FIELDS = ["names"]
+
+    def __init__(self, names, minutes, n_steps, n_ingredients,
+                 ingredient_offsets, ingredient_ids, tag_offsets, tag_ids, tag_masks, ingredient_terms,
+                 ingredient_vocab, tag_vocab, term_vocab):
+        self.names = names
+        self.minutes = minutes
+        self.n_steps = n_steps
+        self.n_ingredients = n_ingredients
+        self.ingredient_offsets = ingredient_offsets
+        self.ingredient_ids = ingredient_ids
+        self.tag_offsets = tag_offsets
+        self.tag_ids = tag_ids
+        # Bit per PREDEFINED_TAGS entry the recipe carries, see TAG_BITS
+        self.tag_masks = tag_masks
+        self.ingredient_terms = ingredient_terms
+        self.ingredient_vocab = ingredient_vocab
+        self.tag_vocab = tag_vocab
+        self.lexicon = IngredientLexicon(term_vocab, ingredient_terms, ingredient_vocab)
+
+    @classmethod
+    def from_ingest(cls, parsed, ingredient_vocab=None, tag_vocab=None, term_vocab=None):
+        # Returns (store, cold): cold holds each row's (description, steps), which the
+        # store does not keep. Interns into the given vocabularies (new, empty ones by default).
+        ingredient_vocab = ingredient_vocab if ingredient_vocab is not None else Vocabulary()
+        tag_vocab = tag_vocab if tag_vocab is not None else Vocabulary()
+        term_vocab = term_vocab if term_vocab is not None else Vocabulary()
+        names, cold = [], []
+        minutes, n_steps, n_ingredients = [], [], []
+        ingredient_lists, tag_lists = [], []
+
+        for _, row in parsed.rows_iter():
+            name = str(row["name"]).strip() if row["name"] is not None else ""
+            names.append(format_title(name) or "Unnamed Recipe")
+
+            description = str(row["description"]).strip() if row["description"] is not None else None
+            instructions = capitalize_steps(step for step in row["steps"] if isinstance(step, str))
+            cold.append((None if description == "#NAME?" else format_description(description), instructions))
+
+            ingredients = [ing for ing in row["ingredients"] if isinstance(ing, str)]
+            ingredient_lists.append([ingredient_vocab.intern(ing) for ing in ingredients])
+            tag_lists.append([tag_vocab.intern(tag) for tag in row["tags"] if isinstance(tag, str)])
+
+            minutes.append(_to_int(row["minutes"]))
+            n_steps.append(_to_int(row["n_steps"], len(instructions)))
+            n_ingredients.append(_to_int(row["n_ingredients"], len(ingredients)))
+
+        ingredient_offsets, ingredient_ids = _csr(ingredient_lists)
+        tag_offsets, tag_ids = _csr(tag_lists)
+
+        # OR each recipe's predefined-tag bits together in one vectorized pass
+        vocab_bits = np.array([TAG_BITS.get(tag, 0) for tag in tag_vocab.strings], dtype=np.uint32)
+        tag_masks = np.zeros(len(names), dtype=np.uint32)
+        rows = np.repeat(np.arange(len(names)), np.diff(tag_offsets))
+        np.bitwise_or.at(tag_masks, rows, vocab_bits[tag_ids])
+
+        # Compile every spelling into the canonical ingredient ID space once, here
+        ingredient_terms = canonicalize(ingredient_vocab.strings, term_vocab)
+
+        store = cls(
+            StringColumn.from_strings(names),
+            np.array(minutes, dtype=np.int64),
+            np.array(n_steps, dtype=np.int32),
+            np.array(n_ingredients, dtype=np.int32),
+            ingredient_offsets, ingredient_ids, tag_offsets, tag_ids, tag_masks, ingredient_terms,
+            ingredient_vocab, tag_vocab, term_vocab,
+        )
+        return store, cold
+
+    def to_sections(self):
+        sections = {}
+        for field in self.ARRAY_FIELDS:
+            sections[f"store.{field}"] = getattr(self, field).tobytes()
+        for field in self.STRING_FIELDS:
+            column = getattr(self, field)
+            sections[f"store.{field}.data"] = bytes(column.data)
+            sections[f"store.{field}.offsets"] = column.offsets.tobytes()
+        sections["store.vocab"] = pickle.dumps(
+            {
+                "ingredients": self.ingredient_vocab.strings,
+                "tags": self.tag_vocab.strings,
+                "terms": self.lexicon.terms.strings,
+            },
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        return sections
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        # Columns are zero-copy views into the snapshot's memory map, so the
+        # snapshot must stay open for as long as the store is in use
+        arrays = {field: snapshot.array(f"store.{field}", dtype) for field, dtype in cls.ARRAY_FIELDS.items()}
+        strings = {
+            field: StringColumn(snapshot.section(f"store.{field}.data"),
+                                snapshot.array(f"store.{field}.offsets", np.int64))
+            for field in cls.STRING_FIELDS
+        }
+        vocab = snapshot.load("store.vocab")
+        return cls(
+            ingredient_vocab=Vocabulary(vocab["ingredients"]),
+            tag_vocab=Vocabulary(vocab["tags"]),
+            term_vocab=Vocabulary(vocab["terms"]),
+            **arrays, **strings,
+        )
+
+    def extended(self, parsed):
+        # (store, cold) like from_ingest, for a new store with the parsed rows appended;
+        # their IDs continue from len(self). Vocabularies are copied before new strings
+        # are interned, so this store and anything built over it stay unchanged.
+        delta, cold = RecipeStore.from_ingest(
+            parsed, self.ingredient_vocab.copy(), self.tag_vocab.copy(), self.lexicon.terms.copy()
+        )
+        columns = {}
+        for field in self.ARRAY_FIELDS:
+            old, new = getattr(self, field), getattr(delta, field)
+            if field == "ingredient_terms":
+                # The delta's covers the whole copied vocabulary already
+                columns[field] = new
+                continue
+            if field.endswith("_offsets"):
+                new = new[1:] + old[-1]
+            columns[field] = np.concatenate([old, new])
+        for field in self.STRING_FIELDS:
+            columns[field] = getattr(self, field).concat(getattr(delta, field))
+        store = RecipeStore(
+            ingredient_vocab=delta.ingredient_vocab, tag_vocab=delta.tag_vocab,
+            term_vocab=delta.lexicon.terms, **columns,
+        )
+        return store, cold
+
+    def __len__(self):
+        return len(self.minutes)
+
+    def name(self, recipe_id):
+        return self.names[recipe_id]
+
+    def ingredient_ids_of(self, recipe_id):
+        return self.ingredient_ids[self.ingredient_offsets[recipe_id]:self.ingredient_offsets[recipe_id + 1]]
+
+    def ingredients(self, recipe_id):
+        strings = self.ingredient_vocab.strings
+        return [strings[i] for i in self.ingredient_ids_of(recipe_id).tolist()]
+
+    def tags(self, recipe_id):
+        strings = self.tag_vocab.strings
+        start, end = self.tag_offsets[recipe_id], self.tag_offsets[recipe_id + 1]
+        return [strings[i] for i in self.tag_ids[start:end].tolist()]
+
+    def term_ids_of(self, recipe_id):
+        # Canonical term of each of the recipe's ingredients, in listed order
+        return self.ingredient_terms[self.ingredient_ids_of(recipe_id)]
+
+    def term_postings(self, start=0):
+        # term ID -> sorted, distinct IDs of the recipes from row start on, as (offsets, recipe_ids)
+        first = self.ingredient_offsets[start]
+        offsets, rows = group_by_value(
+            self.ingredient_offsets[start:] - first,
+            self.ingredient_terms[self.ingredient_ids[first:]],
+            len(self.lexicon),
+        )
+        return offsets, rows + np.int32(start)
+
+    @property
+    def nbytes(self):
+        arrays = sum(getattr(self, field).nbytes for field in self.ARRAY_FIELDS)
+        return arrays + sum(getattr(self, field).nbytes for field in self.STRING_FIELDS)
@@ -0,0 +1,19 @@
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _run(code):
+    # In a fresh interpreter from the repository root, where only the package is importable
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONPATH"}
+    return subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, env=env,
+                          capture_output=True, text=True, timeout=120)
+
+
+def test_backend_imports_as_a_package():
+    result = _run("import backend, backend.main; "
+                  "assert backend.app is backend.main.app; "
+                  "assert backend.app.url_map.bind('').match('/ready')")
+    assert result.returncode == 0, result.stderr
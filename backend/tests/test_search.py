@@ -0,0 +1,30 @@
+import csv
+
+import main
+from benchmarks.e2e import start_registry
+from benchmarks.generate import HEADER, generate_rows
+
+
+def test_ranking_is_cached_once_a_cursor_is_followed(tmp_path):
+    data_file = tmp_path / "RAW_recipes.csv"
+    with open(data_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(generate_rows(2000))
+    start_registry(str(data_file), str(tmp_path / "RAW_recipes.snapshot"))
+    main.search_cache.clear()
+    main.ranking_cache.clear()
+    client = main.app.test_client()
+
+    first = client.post("/search", json={"ingredients": ["salt", "butter"], "limit": 10}).get_json()
+    assert first["total_matches"] > 30
+    assert main.ranking_cache.stats()["entries"] == 0
+
+    second = client.post("/search", json={"cursor": first["next_cursor"], "limit": 10}).get_json()
+    assert main.ranking_cache.stats()["entries"] == 1
+    hits = main.ranking_cache.stats()["hits"]
+    third = client.post("/search", json={"cursor": second["next_cursor"], "limit": 10}).get_json()
+    assert main.ranking_cache.stats()["hits"] == hits + 1
+
+    pages = [recipe["id"] for page in (first, second, third) for recipe in page["recipes"]]
+    assert len(set(pages)) == 30
@@ -0,0 +1,30 @@
+import csv
+import io
+
+from benchmarks.generate import HEADER, generate_rows
+from main import compile_snapshot
+from snapshot import classify_source
+
+
+def _csv_text(rows):
+    text = io.StringIO()
+    csv.writer(text).writerows(rows)
+    return text.getvalue()
+
+
+def test_full_build_leaves_out_a_half_written_row(tmp_path):
+    data_file = tmp_path / "RAW_recipes.csv"
+    rows = list(generate_rows(21))
+    last_row = _csv_text(rows[-1:])
+    data_file.write_text(_csv_text([HEADER] + rows[:-1]) + last_row[:len(last_row) // 2], encoding="utf-8")
+
+    store, details, parsed, fingerprint = compile_snapshot(str(data_file), str(tmp_path / "RAW_recipes.snapshot"))
+    assert len(store) == 20
+    assert fingerprint["size"] == data_file.stat().st_size - len(last_row) // 2
+
+    # Once the row is complete, it is picked up as an append
+    with open(data_file, "a", encoding="utf-8", newline="") as f:
+        f.write(last_row[len(last_row) // 2:])
+    change, appended = classify_source(fingerprint, str(data_file))
+    assert change == "appended"
+    assert appended["size"] == data_file.stat().st_size
@@ -0,0 +1,108 @@
+import csv
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from benchmarks.generate import ensure_dataset, generate_rows
+from benchmarks.workers import BACKEND_DIR, measure, wait_ready
+
+# Without result caches, a worker's private memory is only what serving un-shares:
+# about 16% of the master's RSS on the 10k dataset. A worker holding its own copy of
+# the indexes would be far above this.
+MAX_WORKER_PRIVATE_FRACTION = 0.25
+needs_fork = pytest.mark.skipif(not hasattr(os, "fork"), reason="serve forks its workers")
+
+
+@needs_fork
+def test_workers_share_the_masters_indexes():
+    run = measure(ensure_dataset("10k"), workers=2, requests=300, concurrency=4, result_caches=False)
+    if run["memory"] is None:
+        pytest.skip("memory breakdown needs /proc/<pid>/smaps_rollup")
+    assert run["workers"] == 2
+    assert run["memory"]["mean_worker_overhead_ratio"] < MAX_WORKER_PRIVATE_FRACTION
+
+
+def _post(connection, path, body):
+    connection.request("POST", path, body=json.dumps(body), headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    return response.status, response.read()
+
+
+def _get(port, path):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    connection.request("GET", path)
+    response = connection.getresponse()
+    body = json.loads(response.read())
+    connection.close()
+    return body
+
+
+@needs_fork
+def test_rolling_workers_finishes_requests_in_flight(tmp_path):
+    data_file = tmp_path / "RAW_recipes.csv"
+    shutil.copy(ensure_dataset("10k"), data_file)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    log = open(tmp_path / "serve.log", "w")
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "main.py"), "serve", "--workers", "2",
+         "--port", str(port), "--no-result-cache"],
+        cwd=tmp_path, stdout=log, stderr=subprocess.STDOUT,
+    )
+    served, failures = [], []
+    done = threading.Event()
+
+    def client(number):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        queries = [["salt", "butter"], ["eggs", "flour", "milk"], ["garlic", "onion"], ["sugar"]]
+        while not done.is_set():
+            body = {"ingredients": queries[len(served) % len(queries)], "sort_by": "coverage"}
+            try:
+                status, _ = _post(connection, "/search", body)
+                (served if status == 200 else failures).append(status)
+            except (http.client.HTTPException, OSError) as e:
+                failures.append(repr(e))
+                connection.close()
+        connection.close()
+
+    try:
+        generation = wait_ready(port, 120)["generation"]
+        clients = [threading.Thread(target=client, args=(number,)) for number in range(8)]
+        for thread in clients:
+            thread.start()
+        for round_number in range(3):
+            time.sleep(0.5)
+            with open(data_file, "a", newline="", encoding="utf-8") as f:
+                rows = list(generate_rows(20, seed=round_number + 1))
+                for offset, row in enumerate(rows):
+                    row[1] = 1_000_000 + 100 * round_number + offset
+                csv.writer(f).writerows(rows)
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            _post(connection, "/refresh", {})
+            connection.close()
+            deadline = time.monotonic() + 60
+            while _get(port, "/ready").get("generation") == generation and time.monotonic() < deadline:
+                time.sleep(0.1)
+            generation = _get(port, "/ready")["generation"]
+        # Let the last set of old workers drain and exit
+        time.sleep(2)
+        done.set()
+        for thread in clients:
+            thread.join()
+    finally:
+        done.set()
+        server.terminate()
+        server.wait(timeout=60)
+        log.close()
+
+    assert len(served) > 100
+    assert failures == []
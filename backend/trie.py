@@ -0,0 +1,200 @@
+from array import array
+import heapq
+
+# Completions precomputed per node; prefix_search can return at most this many
+TOP_K = 10
+
+
+# Radix (path-compressed) trie node: the edge into a node carries a whole label,
+# so chains of single-child nodes collapse into one
+class RadixNode:
+    __slots__ = ("label", "children", "recipes", "top")
+
+    def __init__(self, label=""):
+        self.label = label
+        self.children = None  # first character of a child's label -> child
+        # Recipe IDs stored under the key ending here, as a flat int64 array rather than
+        # a list of int objects: reading it never writes to the shared IDs' reference
+        # counts, so the pages stay shared between forked workers
+        self.recipes = None
+        # Best completions in this subtree as (-score, key) pairs; None on leaves,
+        # whose only completion is their own key
+        self.top = None
+
+    def child(self, char):
+        return self.children.get(char) if self.children else None
+
+    def add_child(self, node):
+        if self.children is None:
+            self.children = {}
+        self.children[node.label[0]] = node
+
+    def copy(self):
+        node = RadixNode(self.label)
+        node.children = dict(self.children) if self.children else None
+        node.recipes = array("q", self.recipes) if self.recipes is not None else None
+        node.top = self.top
+        return node
+
+
+def _completions(node, key, score):
+    # A leaf's only completion is its own key, so leaves keep no top list
+    if node.top is None:
+        return [(-score(node.recipes), key)] if node.recipes else []
+    return node.top
+
+
+class RadixTrie:
+    def __init__(self):
+        self.root = RadixNode()
+        # IDs of the nodes this trie may modify; None means all of them. A fork starts
+        # out owning nothing and copies nodes on first write (path copying).
+        self._owned = None
+
+    def fork(self):
+        # A new trie sharing every node with this one. Inserting into the fork copies
+        # only the nodes on the inserted key's path, so this trie never changes and
+        # readers can keep using it while the fork is filled and finalized.
+        fork = type(self)()
+        fork.root = self.root
+        fork._owned = set()
+        return fork
+
+    def _owns(self, node):
+        return self._owned is None or id(node) in self._owned
+
+    def _new_node(self, label):
+        node = RadixNode(label)
+        if self._owned is not None:
+            self._owned.add(id(node))
+        return node
+
+    def _writable(self, parent, node):
+        # node itself if this trie owns it, else a copy swapped into the (owned) parent
+        if self._owns(node):
+            return node
+        node = node.copy()
+        self._owned.add(id(node))
+        if parent is None:
+            self.root = node
+        else:
+            parent.children[node.label[0]] = node
+        return node
+
+    def _node_for(self, key):
+        # Walk to the node for key, creating or splitting edges as needed
+        node, i = self._writable(None, self.root), 0
+        while i < len(key):
+            child = node.child(key[i])
+            if child is None:
+                leaf = self._new_node(key[i:])
+                node.add_child(leaf)
+                return leaf
+            child = self._writable(node, child)
+            label = child.label
+            if key.startswith(label, i):
+                node, i = child, i + len(label)
+                continue
+            # Split the edge at the end of the common prefix
+            common = 1
+            while common < len(label) and i + common < len(key) and label[common] == key[i + common]:
+                common += 1
+            middle = self._new_node(label[:common])
+            node.children[key[i]] = middle
+            child.label = label[common:]
+            middle.add_child(child)
+            node, i = middle, i + common
+        return node
+
+    def _find(self, key):
+        node, i = self.root, 0
+        while i < len(key):
+            child = node.child(key[i])
+            if child is None or not key.startswith(child.label, i):
+                return None
+            node, i = child, i + len(child.label)
+        return node
+
+    def _insert(self, key, recipe_ids):
+        node = self._node_for(key)
+        if node.recipes is None:
+            node.recipes = array("q")
+        node.recipes.extend(recipe_ids)
+
+    def _search(self, key):
+        node = self._find(key)
+        if node is None or node.recipes is None:
+            return []
+        return node.recipes
+
+    def finalize(self, top_k=TOP_K, score=len):
+        # Precompute each internal node's best completions bottom-up. score maps a
+        # key's recipe list to its popularity; ties go to the alphabetically first key.
+        # A fork only revisits the nodes it copied or created: every other subtree is
+        # unchanged, so its completions are still valid.
+        order, stack = [], [(self.root, "")]
+        while stack:
+            node, key = stack.pop()
+            order.append((node, key))
+            if node.children:
+                stack.extend(
+                    (child, key + child.label) for child in node.children.values() if self._owns(child)
+                )
+        for node, key in reversed(order):
+            if not node.children:
+                node.top = None
+                continue
+            entries = [(-score(node.recipes), key)] if node.recipes else []
+            for child in node.children.values():
+                entries.extend(_completions(child, key + child.label, score))
+            node.top = tuple(heapq.nsmallest(top_k, entries))
+
+    def _prefix_search(self, prefix, limit):
+        # Returns up to `limit` (key, score) completions of prefix, most popular first
+        node, key, i = self.root, "", 0
+        while i < len(prefix):
+            child = node.child(prefix[i])
+            if child is None:
+                return []
+            label = child.label
+            if not (prefix.startswith(label, i) or label.startswith(prefix[i:])):
+                return []
+            node, key, i = child, key + label, i + len(label)
+        if node.top is None:
+            # A leaf: the only completion is its own key
+            return [(key, len(node.recipes))] if node.recipes else []
+        return [(completion, -neg_score) for neg_score, completion in node.top[:limit]]
+
+
+# Trie Data Structure for Ingredient-Based Lookup
+class Trie(RadixTrie):
+    def insert(self, ingredient, recipe):
+        self._insert(ingredient, (recipe,))
+
+    def insert_all(self, ingredient, recipes):
+        self._insert(ingredient, recipes)
+
+    def search(self, ingredient):
+        return self._search(ingredient)
+
+    def prefix_search(self, prefix, limit=TOP_K):
+        return self._prefix_search(prefix, limit)
+
+
+# Trie Data Structure for Name-Based Lookup
+class NameTrie(RadixTrie):
+    def insert(self, name, recipe):
+        if not isinstance(name, str):
+            name = str(name)
+        if not name.strip():
+            raise ValueError("Recipe name cannot be empty")
+        self._insert(name.lower(), (recipe,))
+
+    def insert_all(self, name, recipes):
+        self._insert(name.lower(), recipes)
+
+    def search(self, name):
+        return self._search(name.lower())
+
+    def prefix_search(self, prefix, limit=TOP_K):
+        return self._prefix_search(prefix.lower(), limit)
@@ -107,14 +107,20 @@ const App = () => {
     const [loading, setLoading] = useState(false);  
     const [message, setMessage] = useState('');  
     
-    const handleRecipeClick = (recipeName) => {
-        const dataStructure = userDataStructure.toLowerCase();  
-        console.log("Data Structure:", dataStructure);  
-    
-        const encodedRecipeName = encodeURIComponent(recipeName);
-        console.log("Encoded Recipe Name:", encodedRecipeName);  
-    
-        const url = `http://localhost:5000/recipe/${dataStructure}/${encodedRecipeName}`;
+    const handleRecipeClick = (recipe) => {
+        // Search results carry the recipe's ID, so look it up directly instead of by name
+        let url;
+        if (recipe.id !== undefined) {
+            url = `http://localhost:5000/recipe/id/${recipe.id}`;
+        } else {
+            const dataStructure = userDataStructure.toLowerCase();  
+            console.log("Data Structure:", dataStructure);  
+        
+            const encodedRecipeName = encodeURIComponent(recipe.name);
+            console.log("Encoded Recipe Name:", encodedRecipeName);  
+        
+            url = `http://localhost:5000/recipe/${dataStructure}/${encodedRecipeName}`;
+        }
     
         // Fetch the detailed recipe info from Flask
         fetch(url)
@@ -185,6 +191,8 @@ const App = () => {
                     <option value="matched_ingredients">Matched Ingredients</option>
                     <option value="total_time">Total Time</option>
                     <option value="num_steps">Number of Steps</option>
+                    <option value="coverage">Ingredient Coverage</option>
+                    <option value="rarity">Fewest Rare Ingredients Missing</option>
                 </select>
             </div>
     
@@ -29,7 +29,7 @@ const RecipeCard = ({ recipe, onClick, selectedTags = [] }) => {
     return (
         <div
             className="recipe-card"
-            onClick={() => onClick(recipe.name)}
+            onClick={() => onClick(recipe)}
             style={{
                 width: '350px', 
                 height: '420px', 
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 
 const PREDEFINED_TAGS = [
     "vegan", "vegetarian", "gluten-free", "low-carb", "high-protein", "dairy-free",
@@ -8,9 +8,13 @@ const PREDEFINED_TAGS = [
     "sour", "salty"
 ];
 
+const AUTOCOMPLETE_URL = 'http://localhost:5000/autocomplete/ingredients';
+
 const SearchBar = ({ onSearch }) => {
     const [tags, setTags] = useState([]);
     const [ingredients, setIngredients] = useState('');
+    const [suggestions, setSuggestions] = useState([]);
+    const pendingRequest = useRef(null);
 
     const handleTagClick = (tag) => {
         if (tags.includes(tag)) {
@@ -21,9 +25,45 @@ const SearchBar = ({ onSearch }) => {
     };
 
     const handleSearch = () => {
+        setSuggestions([]);
         onSearch(ingredients, tags);
     };
 
+    // Suggest completions for the ingredient currently being typed (after the last comma)
+    const fetchSuggestions = (value) => {
+        const fragment = value.split(',').pop().trimStart();
+        if (pendingRequest.current) {
+            pendingRequest.current.abort();
+        }
+        if (!fragment) {
+            setSuggestions([]);
+            return;
+        }
+
+        const controller = new AbortController();
+        pendingRequest.current = controller;
+        fetch(`${AUTOCOMPLETE_URL}?q=${encodeURIComponent(fragment)}&limit=8`, { signal: controller.signal })
+            .then(response => (response.ok ? response.json() : { completions: [] }))
+            .then(data => setSuggestions(data.completions || []))
+            .catch(error => {
+                if (error.name !== 'AbortError') {
+                    setSuggestions([]);
+                }
+            });
+    };
+
+    const handleIngredientsChange = (e) => {
+        setIngredients(e.target.value);
+        fetchSuggestions(e.target.value);
+    };
+
+    const handleSuggestionClick = (ingredient) => {
+        const parts = ingredients.split(',');
+        parts[parts.length - 1] = (parts.length > 1 ? ' ' : '') + ingredient;
+        setIngredients(parts.join(',') + ', ');
+        setSuggestions([]);
+    };
+
     return (
         <div className="search-bar" style={{ margin: '20px 0' }}>
             <label
@@ -37,21 +77,58 @@ const SearchBar = ({ onSearch }) => {
             >
                 Enter up to 10 ingredients (separated by commas):
             </label>
-            <input
-                type="text"
-                id="ingredientsInput"
-                placeholder="Enter ingredients..."
-                value={ingredients}
-                onChange={(e) => setIngredients(e.target.value)}
-                style={{
-                    padding: '8px',
-                    fontSize: '14px',
-                    width: '60%',
-                    margin: '10px 0',
-                    borderRadius: '4px',
-                    border: '1px solid #ccc'
-                }}
-            />
+            <div style={{ position: 'relative', display: 'inline-block', width: '60%' }}>
+                <input
+                    type="text"
+                    id="ingredientsInput"
+                    placeholder="Enter ingredients..."
+                    value={ingredients}
+                    onChange={handleIngredientsChange}
+                    autoComplete="off"
+                    style={{
+                        padding: '8px',
+                        fontSize: '14px',
+                        width: '100%',
+                        margin: '10px 0',
+                        borderRadius: '4px',
+                        border: '1px solid #ccc',
+                        boxSizing: 'border-box'
+                    }}
+                />
+                {suggestions.length > 0 && (
+                    <ul
+                        className="ingredient-suggestions"
+                        style={{
+                            position: 'absolute',
+                            top: '100%',
+                            left: 0,
+                            right: 0,
+                            margin: '-8px 0 0',
+                            padding: 0,
+                            listStyle: 'none',
+                            textAlign: 'left',
+                            backgroundColor: '#fff',
+                            border: '1px solid #ccc',
+                            borderRadius: '4px',
+                            boxShadow: '2px 2px 6px rgba(0, 0, 0, 0.1)',
+                            zIndex: 10
+                        }}
+                    >
+                        {suggestions.map(suggestion => (
+                            <li
+                                key={suggestion.ingredient}
+                                onMouseDown={() => handleSuggestionClick(suggestion.ingredient)}
+                                style={{ padding: '6px 8px', fontSize: '14px', cursor: 'pointer' }}
+                            >
+                                {suggestion.ingredient}
+                                <span style={{ color: '#999', fontSize: '12px', marginLeft: '8px' }}>
+                                    {suggestion.recipes} recipes
+                                </span>
+                            </li>
+                        ))}
+                    </ul>
+                )}
+            </div>
             <button
                 onClick={handleSearch}
                 style={{